@@ -0,0 +1,137 @@
+"""
+Per-process category registry.
+
+Global categories (user_id NULL, seeded at startup, never edited) are loaded
+once and kept. Each user's own categories sit in an LRU of
+CATEGORY_CACHE_USERS entries that create_category invalidates. Entries also
+expire after CATEGORY_CACHE_TTL_S, so other API workers pick up new
+categories. An id missing from the cached view is re-read from the database
+before it is reported as not found, so a stale entry never rejects a valid
+category.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from .config import CATEGORY_CACHE_TTL_S, CATEGORY_CACHE_USERS
+from .models import Category
+
+
+@dataclass(frozen=True)
+class CategoryInfo:
+    """Detached, immutable copy of a categories row (safe to share across sessions/threads)."""
+    id: int
+    name: str
+    user_id: Optional[int]
+
+
+def _sort_key(c: CategoryInfo) -> Tuple[str, int]:
+    return (c.name, c.id)  # same order as ORDER BY name, id
+
+
+@dataclass(frozen=True)
+class _UserView:
+    loaded_at: float
+    accessible: Dict[int, CategoryInfo]       # global + own, by id
+    own_sorted: Tuple[CategoryInfo, ...]
+    all_sorted: Tuple[CategoryInfo, ...]      # global + own
+
+
+class CategoryRegistry:
+    def __init__(self, max_users: int, ttl_s: int):
+        self.max_users = max_users
+        self.ttl_s = ttl_s
+        self._global: Optional[Tuple[CategoryInfo, ...]] = None
+        self._users: "OrderedDict[int, _UserView]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    # ---------- loading ----------
+
+    def _globals(self, session: Session) -> Tuple[CategoryInfo, ...]:
+        if self._global is None:
+            rows = session.exec(select(Category).where(Category.user_id.is_(None))).all()
+            self._global = tuple(sorted((CategoryInfo(c.id, c.name, None) for c in rows), key=_sort_key))
+        return self._global
+
+    def _load_user(self, session: Session, user_id: int) -> _UserView:
+        rows = session.exec(select(Category).where(Category.user_id == user_id)).all()
+        own = tuple(sorted((CategoryInfo(c.id, c.name, c.user_id) for c in rows), key=_sort_key))
+        glob = self._globals(session)
+        return _UserView(
+            loaded_at=time.monotonic(),
+            accessible={c.id: c for c in glob + own},
+            own_sorted=own,
+            all_sorted=tuple(sorted(glob + own, key=_sort_key)),
+        )
+
+    def _view(self, session: Session, user_id: int, reload: bool = False) -> _UserView:
+        with self._lock:
+            view = self._users.get(user_id)
+            if view is not None and not reload and time.monotonic() - view.loaded_at < self.ttl_s:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return view
+            self.misses += 1
+
+        view = self._load_user(session, user_id)
+        with self._lock:
+            self._users[user_id] = view
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return view
+
+    # ---------- lookups ----------
+
+    def resolve(self, session: Session, user_id: int, category_ids: Iterable[int]) -> Dict[int, CategoryInfo]:
+        """The ids (of `category_ids`) the user may use: their own or global."""
+        ids = set(category_ids)
+        view = self._view(session, user_id)
+        if not ids <= view.accessible.keys():
+            # maybe created since we cached (or in another worker): check the DB once
+            self.reloads += 1
+            view = self._view(session, user_id, reload=True)
+        return {cid: view.accessible[cid] for cid in ids if cid in view.accessible}
+
+    def get(self, session: Session, user_id: int, category_id: int) -> Optional[CategoryInfo]:
+        return self.resolve(session, user_id, (category_id,)).get(category_id)
+
+    def listing(self, session: Session, user_id: int, include_global: bool = True) -> Tuple[CategoryInfo, ...]:
+        """Sorted by (name, id)."""
+        view = self._view(session, user_id)
+        return view.all_sorted if include_global else view.own_sorted
+
+    # ---------- invalidation ----------
+
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        with self._lock:
+            if user_id is None:
+                # global set changed: every cached view embeds it
+                self._global = None
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "globals": len(self._global) if self._global is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "reloads": self.reloads,
+        }
+
+
+category_registry = CategoryRegistry(CATEGORY_CACHE_USERS, CATEGORY_CACHE_TTL_S)
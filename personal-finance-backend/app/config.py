@@ -4,10 +4,82 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 DB_FILE = BASE_DIR / "pfa.sqlite3"
-DATABASE_URL = f"sqlite:///{DB_FILE}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_FILE}")  # or postgresql+psycopg://user:pw@host/db
+
+# Serve the transactions / summary / categories routes as async def on an AsyncSession
+# (aiosqlite or asyncpg) instead of sync def on the thread pool
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+# Connection pool (SQLite file databases and PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))             # connections kept open
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))      # extra connections under burst
+DB_POOL_TIMEOUT_S = int(os.getenv("DB_POOL_TIMEOUT_S", "30"))  # wait for a free connection
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))  # PostgreSQL: reconnect older connections
+
+# SQLite pragmas, applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")      # readers don't block the writer
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")     # fsync at checkpoints, not every commit (safe with WAL)
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))  # page cache per connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
 # OCR/Donut
 DONUT_MODEL_ID = os.getenv("DONUT_MODEL_ID", "naver-clova-ix/donut-base-finetuned-cord-v2")
 DONUT_DEVICE = os.getenv("DONUT_DEVICE", "cpu")  # "cpu" (recommended for now)
 PDF_RASTER_DPI = int(os.getenv("PDF_RASTER_DPI", "300"))
 OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "3"))  # receipts rarely need >1
+DONUT_IMAGE_SIZE = tuple(int(v) for v in os.getenv("DONUT_IMAGE_SIZE", "960x1280").split("x"))  # width x height the processor fits images into
+RECEIPT_AUTOCROP = os.getenv("RECEIPT_AUTOCROP", "1") == "1"  # crop uniform margins before Donut
+RECEIPT_MAX_UPLOAD_MB = int(os.getenv("RECEIPT_MAX_UPLOAD_MB", "15"))  # request body limit on /extract/receipt*; 413 beyond
+DONUT_RUNTIME = os.getenv("DONUT_RUNTIME", "fp32")  # fp32 | int8 | compile | onnx (see donut_runtime.py)
+DONUT_ONNX_DIR = Path(os.getenv("DONUT_ONNX_DIR", str(BASE_DIR / "models")))  # exported encoder for "onnx"
+
+# Inference worker pool (Donut runs off the event loop)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))              # worker processes; 0 => single in-process thread
+OCR_TORCH_THREADS = int(os.getenv("OCR_TORCH_THREADS", "2"))  # torch intra-op threads per worker
+OCR_QUEUE_MAX = int(os.getenv("OCR_QUEUE_MAX", "8"))          # running + waiting jobs before we answer 503
+OCR_BATCH_MAX = int(os.getenv("OCR_BATCH_MAX", "4"))              # receipts per model.generate call (1 => no batching)
+OCR_BATCH_WINDOW_MS = int(os.getenv("OCR_BATCH_WINDOW_MS", "25"))  # how long the first request waits for company
+OCR_WARMUP = os.getenv("OCR_WARMUP", "0") == "1"              # load Donut in every worker right after startup
+
+# Receipt extraction cache (content-addressed: upload bytes + model + parser version)
+RECEIPT_CACHE_DIR = Path(os.getenv("RECEIPT_CACHE_DIR", str(BASE_DIR / "receipts" / ".cache")))
+RECEIPT_CACHE_MEM_ITEMS = int(os.getenv("RECEIPT_CACHE_MEM_ITEMS", "256"))
+RECEIPT_CACHE_DISK_MB = int(os.getenv("RECEIPT_CACHE_DISK_MB", "200"))  # 0 => memory tier only
+PDF_RASTER_THREADS = int(os.getenv("PDF_RASTER_THREADS", "2"))  # pages rendered ahead in parallel
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "20"))  # below this the PDF counts as scanned => Donut
+
+# Receipt jobs (POST /extract/receipt/jobs)
+OCR_TIMEOUT_MS = int(os.getenv("OCR_TIMEOUT_MS", "20000"))      # per-job deadline (receipt jobs API)
+RECEIPT_JOBS_MAX = int(os.getenv("RECEIPT_JOBS_MAX", "256"))    # jobs kept in memory
+RECEIPT_JOB_TTL_S = int(os.getenv("RECEIPT_JOB_TTL_S", "600"))  # finished jobs expire after this
+
+# Transactions
+BULK_INSERT_CHUNK = int(os.getenv("BULK_INSERT_CHUNK", "5000"))  # rows per executemany in /transactions/bulk
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))  # rows fetched per round trip / Parquet row group
+
+# Auth: verified bearer token -> principal cache (get_current_user)
+AUTH_CACHE_TTL_S = int(os.getenv("AUTH_CACHE_TTL_S", "60"))     # never beyond the token's own exp
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "4096"))       # cached tokens (LRU)
+
+# Password hashing (bcrypt runs in its own small thread pool, see app/core/security.py)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))          # cost factor; stored hashes are upgraded on login
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))         # concurrent hash/verify calls
+BCRYPT_QUEUE_MAX = int(os.getenv("BCRYPT_QUEUE_MAX", "16"))    # running + waiting before we answer 503
+
+# Category registry (global categories cached for the process lifetime, user categories per-user LRU)
+CATEGORY_CACHE_USERS = int(os.getenv("CATEGORY_CACHE_USERS", "1024"))  # users kept
+CATEGORY_CACHE_TTL_S = int(os.getenv("CATEGORY_CACHE_TTL_S", "300"))   # picks up categories created by other workers
+
+# Conditional GET: response cache keyed by (user, data version, path, query)
+RESPONSE_CACHE_ITEMS = int(os.getenv("RESPONSE_CACHE_ITEMS", "1024"))
+
+# Metrics (GET /metrics, Server-Timing header)
+METRICS_LATENCY_BUCKETS_MS = tuple(
+    float(ms) for ms in os.getenv("METRICS_LATENCY_BUCKETS_MS", "5,10,25,50,100,250,500,1000,2500,5000,10000,30000").split(",")
+)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # scrapers send "Authorization: Bearer <token>"; empty => no token access
+METRICS_ALLOW_IPS = tuple(  # client addresses/networks allowed without the token; empty => token only
+    ip.strip() for ip in os.getenv("METRICS_ALLOW_IPS", "127.0.0.1,::1").split(",") if ip.strip()
+)
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "200"))  # SQL slower than this is logged (WARNING, logger app.db); 0 => off
@@ -0,0 +1,61 @@
+"""
+Request body size limit, enforced while the body streams in.
+
+Starlette spools a multipart upload to a temp file before the endpoint runs,
+so checking `len(await file.read())` there is too late: the whole body has
+already been received. BodySizeLimitMiddleware answers 413 straight away when
+Content-Length is over the limit, and otherwise counts the body chunks as the
+form parser pulls them and aborts the request once the limit is passed
+(chunked uploads, lying clients).
+"""
+from __future__ import annotations
+import json
+from typing import Any, Callable, Dict, Sequence
+
+from fastapi import HTTPException
+
+
+class BodySizeLimitMiddleware:
+    """413 for request bodies above `max_bytes` on paths starting with one of `prefixes`."""
+
+    def __init__(self, app: Callable, max_bytes: int, prefixes: Sequence[str]) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.prefixes = tuple(prefixes)
+        self.detail = f"Upload too large (limit {max_bytes // (1024 * 1024)} MB)"
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({"detail": self.detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0 or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # surfaces from request.form() as a regular 413 response
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
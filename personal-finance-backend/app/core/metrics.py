@@ -0,0 +1,268 @@
+"""
+In-process metrics: Prometheus text exposition and per-request Server-Timing.
+
+No client library needed. Counters, gauges and histograms live in REGISTRY
+and GET /metrics renders them in the Prometheus text format (0.0.4).
+`register_stats` adds the `stats()` dicts that caches and pools already keep,
+read at scrape time.
+
+Each HTTP request gets a RequestTimings in a contextvar (MetricsMiddleware).
+SQL hooks and pipeline stages add to it via `add_stage`/`add_query`. The
+contextvar is copied into threadpool calls and AsyncSession.run_sync, so sync
+handlers and their queries are counted too. The totals go out in the
+response's `Server-Timing` header.
+"""
+from __future__ import annotations
+import abc
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import METRICS_LATENCY_BUCKETS_MS
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = tuple(ms / 1000 for ms in METRICS_LATENCY_BUCKETS_MS)
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+# ---------- metric types ----------
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines (HELP, TYPE, samples) for this metric."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            row[bisect_left(self.buckets, value)] += 1  # index len(buckets) is +Inf
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = self._header()
+        for labels, row in items:
+            running = 0.0
+            for le, n in zip(self.buckets + (float("inf"),), row):
+                running += n
+                le_label = 'le="%s"' % _fmt(le)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le_label)} {_fmt(running)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(row[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_fmt(running)}")
+        return out
+
+# ---------- registry ----------
+
+def _flatten(prefix: str, stats: Dict[str, Any]) -> Iterator[Tuple[str, float]]:
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (int, float)):  # bools count as 0/1; None (no data yet) is skipped
+            yield name, float(value)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._stats: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def add(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Expose the numeric fields of `stats()` as `<prefix>_<field>` gauges."""
+        self._stats[prefix] = stats
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for prefix, stats in self._stats.items():
+            for name, value in _flatten(prefix, stats()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+register_stats = REGISTRY.register_stats
+
+HTTP_REQUEST_SECONDS = REGISTRY.add(Histogram(
+    "pfa_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+))
+HTTP_IN_FLIGHT = REGISTRY.add(Gauge(
+    "pfa_http_requests_in_flight", "HTTP requests currently being served.", ("method",),
+))
+DB_QUERY_SECONDS = REGISTRY.add(Histogram(
+    "pfa_db_query_duration_seconds", "SQL statement execution time.", ("operation",),
+))
+DB_SLOW_QUERIES = REGISTRY.add(Counter(
+    "pfa_db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("operation",),
+))
+STAGE_SECONDS = REGISTRY.add(Histogram(
+    "pfa_stage_duration_seconds", "Time spent per pipeline stage (receipt extraction).", ("stage",),
+))
+
+# ---------- per-request timings ----------
+
+class RequestTimings:
+    """Accumulated durations (seconds) for one request; shared with the threads it spawns."""
+
+    __slots__ = ("stages", "queries", "db_s")
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.queries = 0
+        self.db_s = 0.0
+
+    def server_timing(self, total_s: float) -> str:
+        parts = []
+        if self.queries:
+            parts.append(f'db;dur={self.db_s * 1000:.1f};desc="{self.queries} queries"')
+        for name, seconds in self.stages.items():
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+        parts.append(f"total;dur={total_s * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+def detach_request() -> None:
+    """For background tasks that outlive their request: keep metrics, stop adding to its Server-Timing."""
+    _current.set(None)
+
+def add_stage(name: str, seconds: float) -> None:
+    """Record one stage run: histogram always, Server-Timing when inside a request."""
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _current.get()
+    if timings is not None:
+        timings.stages[name] = timings.stages.get(name, 0.0) + seconds
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - started)
+
+def add_query(operation: str, seconds: float) -> None:
+    DB_QUERY_SECONDS.observe(seconds, operation)
+    timings = _current.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.db_s += seconds
+
+# ---------- ASGI middleware ----------
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    # unmatched paths (404s, scanners) share one label so the series count stays bounded
+    return path or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Latency histogram + in-flight gauge per request, and the Server-Timing header."""
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.server_timing(time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec(method)
+            _current.reset(token)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method, _route_template(scope), str(status))
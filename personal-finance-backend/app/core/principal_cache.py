@@ -0,0 +1,125 @@
+"""
+Verified bearer token -> Principal cache for get_current_user.
+
+A hit skips both the JWT signature check and the users lookup. Entries live
+for AUTH_CACHE_TTL_S but never past the token's `exp`, the cache is a bounded
+LRU, and any ORM update/delete of a User drops that user's entries.
+"""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from ..config import AUTH_CACHE_MAX, AUTH_CACHE_TTL_S
+from ..models import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """What routers need about the caller; use it instead of loading a User row."""
+    id: int
+    email: str
+    name: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, email=user.email, name=user.name)
+
+
+def _token_key(token: str) -> str:
+    # don't keep raw bearer tokens around in memory
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    def __init__(self, max_items: int, ttl_s: int):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, key: str) -> None:
+        principal, _ = self._entries.pop(key)
+        keys = self._by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[principal.id]
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = _token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if time.time() >= expires_at:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float]) -> None:
+        if self.max_items <= 0 or self.ttl_s <= 0:
+            return
+        expires_at = time.time() + self.ttl_s
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        key = _token_key(token)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (principal, expires_at)
+            self._by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_items": self.max_items,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_MAX, AUTH_CACHE_TTL_S)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    if target.id is not None:
+        principal_cache.invalidate_user(target.id)
@@ -1,14 +1,26 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from ..config import BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_QUEUE_MAX
+
 # Strong secret key — in production load from .env
 SECRET_KEY = "super-secret-change-this"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min == max rounds: a stored hash at any other cost "needs update" and is rehashed on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,6 +28,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# ---------- hashing pool ----------
+
+class HashingBusy(Exception):
+    """Raised when the bcrypt pool already has BCRYPT_QUEUE_MAX calls in flight."""
+
+
+class HashingPool:
+    """
+    Dedicated threads for bcrypt (it releases the GIL), so a login burst
+    queues here instead of occupying the shared AnyIO threads that every sync
+    route runs on. Past queue_max in-flight calls, callers are rejected at once.
+    """
+
+    def __init__(self, workers: int, queue_max: int):
+        self.workers = max(1, workers)
+        self.queue_max = max(self.workers, queue_max)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.queue_max:
+                self.rejected += 1
+                raise HashingBusy()
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rounds": BCRYPT_ROUNDS,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_pool = HashingPool(BCRYPT_WORKERS, BCRYPT_QUEUE_MAX)
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(ok, new_hash): new_hash is set when the stored hash should be replaced (e.g. other cost)."""
+    return await hashing_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if "sub" in to_encode:
@@ -0,0 +1,148 @@
+"""
+Per-user data version, ETags and a small response cache for read endpoints.
+
+`user_data_versions.version` goes up in the same DB transaction as every
+write that changes what a user's read endpoints return (transaction
+create/bulk/import/update/delete, category create). Read endpoints wrap
+their work in versioned_response():
+
+  1. read the version (primary-key lookup, never the transactions table)
+  2. If-None-Match equals the ETag of (user, version, path, query)  -> 304
+  3. same key in the response cache                                  -> cached body
+  4. otherwise build the payload, cache it, return it with the ETag
+
+Old versions are never served: they simply stop being asked for and age
+out of the LRU.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from .config import RESPONSE_CACHE_ITEMS
+from .models import UserDataVersion
+
+CACHE_CONTROL = "private, no-cache"  # browsers may keep it, but must revalidate
+
+# ---------- version ----------
+
+def bump(session: Session, user_id: int) -> None:
+    """+1 for user_id (creates the row at 1). Call before the write's commit."""
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        ins = (sqlite_insert if dialect == "sqlite" else pg_insert)(UserDataVersion)
+        session.exec(
+            ins.values(user_id=user_id, version=1).on_conflict_do_update(
+                index_elements=["user_id"], set_={"version": UserDataVersion.version + 1},
+            )
+        )
+        return
+    res = session.exec(
+        update(UserDataVersion)
+        .where(UserDataVersion.user_id == user_id)
+        .values(version=UserDataVersion.version + 1)
+    )
+    if res.rowcount == 0:
+        session.exec(insert(UserDataVersion).values(user_id=user_id, version=1))
+
+def current(session: Session, user_id: int) -> int:
+    version = session.exec(
+        select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+    ).first()
+    return version or 0
+
+# ---------- response cache ----------
+
+CacheKey = Tuple[int, int, str, str]  # (user_id, version, path, canonical query)
+
+
+class ResponseCache:
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: CacheKey, body: bytes) -> None:
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": len(self._items),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_ITEMS)
+
+
+def _etag(key: CacheKey) -> str:
+    user_id, version, path, query = key
+    digest = hashlib.sha256(f"{path}?{query}".encode()).hexdigest()[:16]
+    return f'"{user_id}-{version}-{digest}"'
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # weak comparison, as If-None-Match requires
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+def versioned_response(request: Request, session: Session, user_id: int, build: Callable[[], Any]) -> Response:
+    """
+    Conditional + cached JSON response for a read endpoint. `build()` is only
+    called when neither the client nor the cache has this version.
+    """
+    # version first: the payload built below is at least this new
+    key: CacheKey = (
+        user_id,
+        current(session, user_id),
+        request.url.path,
+        "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+    )
+    etag = _etag(key)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if _matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key)
+    if body is None:
+        # same encoding as FastAPI's JSONResponse
+        body = json.dumps(
+            jsonable_encoder(build()), ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        ).encode("utf-8")
+        response_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
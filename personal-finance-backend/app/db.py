@@ -1,17 +1,240 @@
-import os
+import logging
+import time
+from functools import lru_cache
 from pathlib import Path
-from sqlmodel import SQLModel, Session, create_engine
+from typing import Any, Dict, Optional, Tuple
 
-DB_FILE = Path("pfa.sqlite3")
-DATABASE_URL = f"sqlite:///{DB_FILE}"
+from alembic import command
+from alembic.config import Config
+from fastapi import Request
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+from .config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_S, DB_POOL_RECYCLE_S,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE_MB, SQLITE_CACHE_SIZE_MB,
+    SQLITE_BUSY_TIMEOUT_MS, SLOW_QUERY_MS,
+)
+from .core import metrics
+
+log = logging.getLogger(__name__)
+
+# ---------- engine ----------
+
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "mmap_size": SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+    "cache_size": -SQLITE_CACHE_SIZE_MB * 1024,  # negative = KiB
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+
+def _set_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+
+def _sqlite_begin(engine: Engine) -> None:
+    """
+    Issue BEGIN ourselves instead of pysqlite, so write sessions can use
+    BEGIN IMMEDIATE (execution option sqlite_begin="IMMEDIATE", see
+    write_engine). A deferred transaction that reads first and writes later
+    fails at once with "database is locked" when another writer committed in
+    between (WAL snapshot); IMMEDIATE takes the write lock up front and waits
+    for it up to busy_timeout instead.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None  # no implicit BEGIN from the driver
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', 'DEFERRED')}")
+
+# ---------- query instrumentation ----------
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA"}
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip()[:8].split(None, 1)
+    op = word[0].upper() if word else ""
+    return op if op in _OPERATIONS else "OTHER"
+
+def _instrument_queries(engine: Engine) -> None:
+    """Time every statement: /metrics histogram, per-request Server-Timing, slow-query log."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        op = _operation(statement)
+        metrics.add_query(op, elapsed)
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            metrics.DB_SLOW_QUERIES.inc(op)
+            log.warning("slow query (%.1f ms%s): %s", elapsed * 1000,
+                        ", executemany" if executemany else "", " ".join(statement.split())[:1000])
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(ctx):
+        # after_cursor_execute doesn't run for a failed statement
+        started = ctx.connection.info.get("query_started") if ctx.connection is not None else None
+        if started:
+            started.pop()
+
+def _engine_options(
+    u: URL, queue_pool: type, sqlite_pragmas: Optional[Dict[str, Any]], kw: Dict[str, Any],
+    sqlite_connect_args: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    create_engine kwargs for `u` (pool class, sizing, connect args; `kw` wins)
+    and the pragmas to set on each SQLite connection (None for other backends).
+    `queue_pool` is QueuePool or AsyncAdaptedQueuePool.
+    """
+    if u.get_backend_name() != "sqlite":
+        options: Dict[str, Any] = dict(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_S,
+            pool_recycle=DB_POOL_RECYCLE_S,
+            pool_pre_ping=True,
+        )
+        options.update(kw)
+        return options, None
+
+    in_memory = u.database in (None, "", ":memory:")
+    options = {"connect_args": {**(sqlite_connect_args or {}), "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    if in_memory:
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            poolclass=queue_pool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_S,
+        )
+    options.update(kw)
+    pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    if in_memory:
+        pragmas.pop("journal_mode", None)  # WAL needs a file
+        pragmas.pop("mmap_size", None)
+    return options, pragmas
+
+def _configure(engine: Engine, sqlite_pragmas: Optional[Dict[str, Any]]) -> None:
+    """Event hooks shared by the sync engine and the async engine's sync_engine."""
+    if sqlite_pragmas is not None:
+        _set_sqlite_pragmas(engine, sqlite_pragmas)
+        _sqlite_begin(engine)
+    _instrument_queries(engine)
+
+def make_engine(url: str = DATABASE_URL, sqlite_pragmas: Optional[Dict[str, Any]] = None, **kw: Any) -> Engine:
+    """
+    Engine for `url` with pooling set up for its backend.
+
+    SQLite files: a QueuePool of connections usable from any thread, each
+    configured with SQLITE_PRAGMAS (or `sqlite_pragmas`) on connect. In-memory
+    SQLite shares one connection. Anything else (PostgreSQL): a sized
+    QueuePool with pre-ping and recycling.
+    """
+    u = make_url(url)
+    options, pragmas = _engine_options(u, QueuePool, sqlite_pragmas, kw, {"check_same_thread": False})
+    engine = create_engine(u, echo=False, **options)
+    _configure(engine, pragmas)
+    return engine
+
+engine = make_engine()
+
+# sessions that write: BEGIN IMMEDIATE on SQLite (the option is ignored elsewhere)
+WRITE_OPTIONS = {"sqlite_begin": "IMMEDIATE"}
+write_engine = engine.execution_options(**WRITE_OPTIONS)
+
+# ---------- async engine (DB_ASYNC=1) ----------
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def make_async_engine(url: str = DATABASE_URL, sqlite_pragmas: Optional[Dict[str, Any]] = None, **kw: Any) -> AsyncEngine:
+    """
+    Async counterpart of make_engine: aiosqlite for SQLite, asyncpg for
+    PostgreSQL, same pool sizing and SQLite pragmas.
+    """
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} URLs")
+    u = u.set(drivername=ASYNC_DRIVERS[backend])
+
+    options, pragmas = _engine_options(u, AsyncAdaptedQueuePool, sqlite_pragmas, kw)
+    async_engine = create_async_engine(u, echo=False, **options)
+    _configure(async_engine.sync_engine, pragmas)
+    return async_engine
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    # created on first use, so the sync-only setup never needs aiosqlite/asyncpg
+    return make_async_engine()
+
+@lru_cache(maxsize=1)
+def get_async_write_engine() -> AsyncEngine:
+    return get_async_engine().execution_options(**WRITE_OPTIONS)
+
+async def dispose_async_engine() -> None:
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+
+# ---------- migrations ----------
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ALEMBIC_INI = BACKEND_DIR / "alembic.ini"
+# Schema that create_all() built before migrations existed
+BASELINE_REVISION = "0001_initial"
+
+def _alembic_config() -> Config:
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    return cfg
+
+def run_migrations() -> None:
+    """Bring the database to the latest migration (fresh, pre-migration or up to date)."""
+    cfg = _alembic_config()
+    for attempt in range(3):
+        try:
+            with write_engine.begin() as conn:
+                cfg.attributes["connection"] = conn
+                tables = set(inspect(conn).get_table_names())
+                if "alembic_version" not in tables and "transactions" in tables:
+                    command.stamp(cfg, BASELINE_REVISION)
+                command.upgrade(cfg, "head")
+            return
+        except OperationalError:
+            # another worker is migrating the same SQLite file; its work is
+            # idempotent with ours, so wait and re-check
+            if attempt == 2:
+                raise
+            time.sleep(1)
 
 def create_db_and_tables() -> None:
-    # Only create tables if database file is missing
-    if not DB_FILE.exists():
-        SQLModel.metadata.create_all(engine)
+    run_migrations()
+
+# only these run on deferred (read) transactions; every other method may write
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+def get_session(request: Request):
+    with Session(engine if request.method in READ_METHODS else write_engine) as session:
+        yield session
 
-def get_session():
-    with Session(engine) as session:
+async def get_async_session(request: Request):
+    bind = get_async_engine() if request.method in READ_METHODS else get_async_write_engine()
+    # no expire on commit: results are serialized after the session's greenlet context
+    async with AsyncSession(bind, expire_on_commit=False) as session:
         yield session
@@ -1,14 +1,161 @@
+import re
+import time
 from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple
 from transformers import DonutProcessor, VisionEncoderDecoderModel
+from transformers.modeling_outputs import BaseModelOutput
 import torch
 
-MODEL_ID = "naver-clova-ix/donut-base-finetuned-cord-v2"
-DEVICE = "cpu"  # keep simple
+from .config import DONUT_MODEL_ID, DONUT_DEVICE, DONUT_RUNTIME, DONUT_ONNX_DIR
+
+MODEL_ID = DONUT_MODEL_ID
+DEVICE = DONUT_DEVICE
+
+TASK_PROMPT = "<s_cord-v2>"  # REQUIRED for CORD model
+
+# fp32    : plain eager model (baseline)
+# int8    : dynamic int8 quantization of every nn.Linear (CPU only)
+# compile : torch.compile'd encoder and decoder
+# onnx    : encoder exported to ONNX and run by onnxruntime, decoder stays in torch
+RUNTIME_VARIANTS = ("fp32", "int8", "compile", "onnx")
+
+# ---------- variants ----------
+
+class _OnnxEncoder(torch.nn.Module):
+    """Drop-in for model.encoder: generate() only needs last_hidden_state."""
+
+    def __init__(self, session, config, main_input_name: str):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.main_input_name = main_input_name
+
+    def forward(self, pixel_values=None, **kwargs):
+        (hidden,) = self.session.run(None, {"pixel_values": pixel_values.cpu().numpy()})
+        return BaseModelOutput(last_hidden_state=torch.from_numpy(hidden).to(pixel_values.device))
+
+class _EncoderForExport(torch.nn.Module):
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+
+    def forward(self, pixel_values):
+        return self.encoder(pixel_values=pixel_values).last_hidden_state
+
+def _onnx_encoder(processor, model) -> _OnnxEncoder:
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise RuntimeError("DONUT_RUNTIME=onnx needs `pip install onnxruntime`") from e
+
+    path = Path(DONUT_ONNX_DIR) / (MODEL_ID.replace("/", "__") + ".encoder.onnx")
+    if not path.exists():
+        # one-time export; later processes reuse the file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = processor.image_processor.size
+        dummy = torch.zeros(1, 3, size["height"], size["width"])
+        with torch.no_grad():
+            torch.onnx.export(
+                _EncoderForExport(model.encoder).eval(),
+                (dummy,),
+                str(path),
+                input_names=["pixel_values"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "last_hidden_state": {0: "batch"}},
+                opset_version=17,
+            )
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = torch.get_num_threads()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+    return _OnnxEncoder(session, model.encoder.config, model.encoder.main_input_name)
+
+def _apply_variant(processor, model, variant: str):
+    if variant == "fp32":
+        return model
+    if variant == "int8":
+        if DEVICE != "cpu":
+            raise ValueError("DONUT_RUNTIME=int8 (dynamic quantization) is CPU only")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if variant == "compile":
+        model.encoder = torch.compile(model.encoder)
+        # decoder sees a growing sequence length every step
+        model.decoder = torch.compile(model.decoder, dynamic=True)
+        return model
+    if variant == "onnx":
+        model.encoder = _onnx_encoder(processor, model)
+        return model
+    raise ValueError(f"Unknown DONUT_RUNTIME {variant!r}; expected one of {RUNTIME_VARIANTS}")
 
 @lru_cache(maxsize=1)
-def get_donut():
+def get_donut(variant: str = DONUT_RUNTIME):
     processor = DonutProcessor.from_pretrained(MODEL_ID)
     model = VisionEncoderDecoderModel.from_pretrained(MODEL_ID)
     model.to(DEVICE)
     model.eval()
+    model = _apply_variant(processor, model, variant)
     return processor, model, DEVICE
+
+# ---------- inference ----------
+
+def _processor_kwargs(processor, images: List) -> Dict[str, bool]:
+    """
+    Images from app/image_prep.py are already fitted and padded to the model input
+    size: then the processor only has to rescale + normalize them.
+    """
+    size = processor.image_processor.size
+    target = (size["width"], size["height"])
+    if all(getattr(img, "size", None) == target for img in images):
+        return {"do_resize": False, "do_thumbnail": False, "do_align_long_axis": False, "do_pad": False}
+    return {}  # anything else (other DONUT_IMAGE_SIZE, direct callers) gets the full resize + pad
+
+def run_donut_batch_timed(images: List) -> Tuple[List[str], Dict[str, float]]:
+    """
+    Images -> CORD markup strings via one batched greedy generate (blocking),
+    plus seconds spent per stage: preprocess (processor), generate, decode.
+    """
+    processor, model, device = get_donut()
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    decoder_input_ids = processor.tokenizer(
+        TASK_PROMPT, add_special_tokens=False, return_tensors="pt"
+    ).input_ids.repeat(len(images), 1).to(device)
+
+    # processor stacks the resized images into one [B, C, H, W] tensor
+    pixel_values = processor(
+        images=list(images), return_tensors="pt", **_processor_kwargs(processor, images),
+    ).pixel_values.to(device)
+    t1 = time.perf_counter()
+    timings["preprocess"] = t1 - t0
+
+    with torch.no_grad():
+        output_ids = model.generate(
+            pixel_values=pixel_values,
+            decoder_input_ids=decoder_input_ids,
+            max_length=512,
+            num_beams=1,
+            early_stopping=True,
+            pad_token_id=processor.tokenizer.pad_token_id,
+            eos_token_id=processor.tokenizer.eos_token_id,
+        )
+    t2 = time.perf_counter()
+    timings["generate"] = t2 - t1
+
+    out: List[str] = []
+    for raw in processor.batch_decode(output_ids, skip_special_tokens=True):
+        # Keep only the JSON-like or tag string if surrounded by extra text
+        m = re.search(r"\{.*\}", raw, flags=re.S)
+        out.append(m.group(0) if m else raw)
+    timings["decode"] = time.perf_counter() - t2
+    return out, timings
+
+def run_donut_batch(images: List) -> List[str]:
+    """Images -> CORD markup strings via one batched greedy generate (blocking)."""
+    return run_donut_batch_timed(images)[0]
+
+def run_donut(img) -> str:
+    """Image -> CORD markup string (blocking; call from an inference worker)."""
+    return run_donut_batch([img])[0]
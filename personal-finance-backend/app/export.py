@@ -0,0 +1,123 @@
+"""
+Encoders for GET /transactions/export.
+
+Each takes an iterator of row batches (id, date, type, category_id, category,
+description, amount_minor) and yields bytes per batch, so nothing holds more
+than one batch at a time. pyarrow is optional and only needed for Parquet;
+it is imported on the first Parquet export, not with the API.
+"""
+from __future__ import annotations
+import csv
+import importlib.util
+import io
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Sequence
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COLUMNS = ("id", "date", "type", "category_id", "category", "description", "amount", "amount_minor")
+
+Batch = Sequence[Sequence[Any]]
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _amount(minor: int) -> str:
+    return f"{Decimal(minor) / Decimal(100):.2f}"
+
+def _type(value: Any) -> str:
+    return getattr(value, "value", value)
+
+# ---------- CSV / NDJSON ----------
+
+def _csv(batches: Iterable[Batch]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for batch in batches:
+        for tx_id, d, t, category_id, category, description, minor in batch:
+            writer.writerow((tx_id, d.isoformat(), _type(t), category_id, category, description, _amount(minor), minor))
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():  # header only (no rows)
+        yield buf.getvalue().encode()
+
+def _ndjson(batches: Iterable[Batch]) -> Iterator[bytes]:
+    for batch in batches:
+        lines: List[str] = []
+        for row in batch:
+            tx_id, d, t, category_id, category, description, minor = row
+            lines.append(json.dumps(dict(zip(COLUMNS, (
+                tx_id, d.isoformat(), _type(t), category_id, category, description, _amount(minor), minor,
+            )))))
+        yield ("\n".join(lines) + "\n").encode()
+
+# ---------- Parquet ----------
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("type", pa.string()),
+        ("category_id", pa.int64()),
+        ("category", pa.string()),
+        ("description", pa.string()),
+        ("amount", pa.decimal128(18, 2)),
+        ("amount_minor", pa.int64()),
+    ])
+
+def _parquet(batches: Iterable[Batch]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            cols = list(zip(*batch))
+            if not cols:
+                continue
+            tx_id, d, t, category_id, category, description, minor = cols
+            writer.write_table(pa.table([
+                tx_id, d, [_type(v) for v in t], category_id, category, description,
+                [Decimal(m) / 100 for m in minor], minor,
+            ], schema=schema))  # one row group per batch
+            yield sink.drain()
+    yield sink.drain()  # footer
+
+def encode_export(fmt: str, batches: Iterable[Batch]) -> Iterator[bytes]:
+    if fmt == "csv":
+        return _csv(batches)
+    if fmt == "ndjson":
+        return _ndjson(batches)
+    return _parquet(batches)
@@ -0,0 +1,178 @@
+"""
+Receipt image preprocessing, in the API process, before Donut.
+
+DonutProcessor fits every image into DONUT_IMAGE_SIZE (960x1280 for CORD-v2)
+and pads the rest, so decoding a phone photo at full resolution and shipping
+it to a worker only to shrink it there costs memory, IPC and CPU for nothing.
+prepare_image instead:
+
+1. finds the receipt on a 1/8-scale decode (JPEG draft mode) and drops the
+   featureless margins around it (plain table, scanner bed, white borders);
+2. decodes again with draft mode at the smallest libjpeg scale (1/2, 1/4,
+   1/8) that still covers the size the cropped receipt will be fitted to;
+3. applies the EXIF orientation;
+4. fits and centre-pads it exactly the way the processor would.
+
+The result is an RGB image of exactly DONUT_IMAGE_SIZE; the worker sees that
+and only rescales/normalizes it (see run_donut_batch_timed).
+"""
+from __future__ import annotations
+import io
+import math
+from typing import Optional, Tuple
+
+from PIL import Image, ImageFilter, UnidentifiedImageError
+
+from .config import DONUT_IMAGE_SIZE, RECEIPT_AUTOCROP
+
+# part of the cache key: bump when the output for the same upload changes
+PREP_VERSION = 2
+
+AUTOCROP_EDGE = 48         # FIND_EDGES response that counts as an edge (print, paper border)
+AUTOCROP_MIN_SHARE = 0.01  # a row/column belongs to the receipt above this share of edge pixels
+AUTOCROP_MIN_SIDE = 0.1    # boxes smaller than this fraction of a side are noise, not a receipt
+AUTOCROP_PAD = 0.02        # keep this fraction of the content size around the box
+_DETECT_SIDE = 256         # the box is searched on a thumbnail this big
+
+Box = Tuple[int, int, int, int]
+
+# EXIF Orientation -> transpose that makes the image upright (as ImageOps.exif_transpose)
+_ORIENTATION = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class BadImage(ValueError):
+    """Upload is not a decodable image (or is a decompression bomb)."""
+
+
+def _open(raw: bytes) -> Image.Image:
+    try:
+        return Image.open(io.BytesIO(raw))
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise BadImage(str(e)) from e
+
+def _span(profile: Image.Image) -> Optional[Tuple[int, int]]:
+    """First and last+1 index whose share of edge pixels is above AUTOCROP_MIN_SHARE."""
+    values = profile.tobytes()
+    hits = [i for i, v in enumerate(values) if v > AUTOCROP_MIN_SHARE * 255]
+    return (hits[0], hits[-1] + 1) if hits else None
+
+def _content_box(img: Image.Image) -> Optional[Box]:
+    """
+    Bounding box (in `img` coordinates) of the receipt, or None to keep the whole image.
+
+    Margins are whatever has no edges: a plain table or scanner bed, white
+    paper around the print, lighting gradients. The receipt is every row and
+    column where more than AUTOCROP_MIN_SHARE of the thumbnail's pixels are
+    edges (print, paper border), so isolated specks don't stretch the box and a
+    textured background simply means no crop.
+    """
+    small = img.reduce(max(1, min(img.size) // _DETECT_SIDE)).convert("L")  # cheap box filter first
+    small.thumbnail((_DETECT_SIDE, _DETECT_SIDE))
+    w, h = small.size
+    if w < 8 or h < 8:
+        return None
+    edges = small.filter(ImageFilter.FIND_EDGES).point(lambda v: 255 if v > AUTOCROP_EDGE else 0)
+    # FIND_EDGES leaves the outermost pixels unfiltered: pad them out as "no edge"
+    inner = Image.new("L", (w, h))
+    inner.paste(edges.crop((1, 1, w - 1, h - 1)), (1, 1))
+    cols = _span(inner.resize((w, 1), Image.Resampling.BOX))
+    rows = _span(inner.resize((1, h), Image.Resampling.BOX))
+    if cols is None or rows is None:
+        return None  # blank
+    if cols[1] - cols[0] < w * AUTOCROP_MIN_SIDE or rows[1] - rows[0] < h * AUTOCROP_MIN_SIDE:
+        return None  # too small to be the receipt
+
+    # thumbnail -> img coordinates, plus a little padding
+    sx, sy = img.width / w, img.height / h
+    pad_x, pad_y = (cols[1] - cols[0]) * AUTOCROP_PAD, (rows[1] - rows[0]) * AUTOCROP_PAD
+    return (
+        max(0, math.floor((cols[0] - pad_x) * sx)), max(0, math.floor((rows[0] - pad_y) * sy)),
+        min(img.width, math.ceil((cols[1] + pad_x) * sx)), min(img.height, math.ceil((rows[1] + pad_y) * sy)),
+    )
+
+def _fit_scale(width: int, height: int, swapped: bool) -> float:
+    target_w, target_h = DONUT_IMAGE_SIZE
+    if swapped:  # EXIF rotates by 90 degrees: fit the upright size
+        width, height = height, width
+    return min(target_w / width, target_h / height)
+
+def _draft(img: Image.Image, scale: float) -> None:
+    """JPEG: have libjpeg decode at the smallest 1/2, 1/4 or 1/8 scale still >= `scale`."""
+    if img.format == "JPEG" and scale < 1:
+        img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+
+def _rescale_box(box: Box, src: Tuple[int, int], dst: Tuple[int, int]) -> Box:
+    sx, sy = dst[0] / src[0], dst[1] / src[1]
+    return (math.floor(box[0] * sx), math.floor(box[1] * sy), math.ceil(box[2] * sx), math.ceil(box[3] * sy))
+
+def fit_image(img: Image.Image) -> Image.Image:
+    """
+    Fit into DONUT_IMAGE_SIZE keeping the aspect ratio, centred on black:
+    DonutImageProcessor's resize (bicubic, like its config) + pad.
+    """
+    target_w, target_h = DONUT_IMAGE_SIZE
+    img = img.convert("RGB")
+    scale = min(target_w / img.width, target_h / img.height)
+    size = (max(1, min(target_w, round(img.width * scale))), max(1, min(target_h, round(img.height * scale))))
+    if size != img.size:
+        img = img.resize(size, Image.Resampling.BICUBIC)
+    if size == (target_w, target_h):
+        return img
+    canvas = Image.new("RGB", (target_w, target_h))
+    canvas.paste(img, ((target_w - size[0]) // 2, (target_h - size[1]) // 2))
+    return canvas
+
+def prepare_page(img: Image.Image) -> Image.Image:
+    """Rendered PDF page -> Donut-sized image (margins cropped, fitted, padded)."""
+    box = _content_box(img) if RECEIPT_AUTOCROP else None
+    if box is not None:
+        img = img.crop(box)
+    return fit_image(img)
+
+def _decode_two_pass(raw: bytes, img: Image.Image, swapped: bool) -> Image.Image:
+    """Baseline JPEG: find the receipt on a cheap 1/8-scale decode, then decode just fine enough for it."""
+    full = img.size
+    img.draft("L", (max(1, full[0] // 8), max(1, full[1] // 8)))
+    box = _content_box(img)
+    box = _rescale_box(box, img.size, full) if box is not None else (0, 0) + full
+
+    img = _open(raw)  # draft() only works before the first load
+    _draft(img, _fit_scale(box[2] - box[0], box[3] - box[1], swapped))
+    img.load()
+    return img.crop(_rescale_box(box, full, img.size)) if box != (0, 0) + full else img
+
+def _decode_one_pass(img: Image.Image, swapped: bool) -> Image.Image:
+    """
+    Everything else. PNG/WebP decode at full size anyway, and a progressive JPEG
+    costs about the same at any draft scale, so decode once, one scale step
+    finer than the uncropped fit needs (room for a crop), then crop.
+    """
+    _draft(img, _fit_scale(img.width, img.height, swapped) * (2 if RECEIPT_AUTOCROP else 1))
+    img.load()
+    box = _content_box(img) if RECEIPT_AUTOCROP else None
+    return img.crop(box) if box is not None else img
+
+def prepare_image(raw: bytes) -> Image.Image:
+    """Uploaded image bytes -> upright, cropped, Donut-sized RGB image. Raises BadImage."""
+    img = _open(raw)
+    orientation = img.getexif().get(0x0112, 1)  # EXIF Orientation tag
+    swapped = orientation in (5, 6, 7, 8)
+    try:
+        if img.format == "JPEG" and RECEIPT_AUTOCROP and not img.info.get("progressive"):
+            img = _decode_two_pass(raw, img, swapped)
+        else:
+            img = _decode_one_pass(img, swapped)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise BadImage(str(e)) from e
+
+    if orientation in _ORIENTATION:
+        img = img.transpose(_ORIENTATION[orientation])
+    return fit_image(img)
@@ -0,0 +1,255 @@
+"""
+Donut inference off the event loop.
+
+Each worker process loads the model once via get_donut() and keeps it for its
+lifetime. The router awaits a future instead of calling model.generate inline,
+so other requests keep being served while a receipt is decoding.
+
+Requests are micro-batched: the first request of a batch waits up to
+OCR_BATCH_WINDOW_MS for others (and for a free worker), then up to
+OCR_BATCH_MAX images go through a single batched generate.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing as mp
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .core import metrics
+from .config import (
+    OCR_WORKERS, OCR_TORCH_THREADS, OCR_QUEUE_MAX,
+    OCR_BATCH_MAX, OCR_BATCH_WINDOW_MS, DONUT_IMAGE_SIZE,
+)
+
+
+class InferenceBusy(Exception):
+    """Raised when the bounded inference queue is full."""
+
+
+# ---------- worker side ----------
+
+def _init_worker(torch_threads: int) -> None:
+    import torch
+    torch.set_num_threads(max(1, torch_threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # already set (in-process thread mode after torch did parallel work)
+        pass
+
+def _infer_batch(images: List) -> Tuple[List[str], Dict[str, float]]:
+    from .donut_runtime import run_donut_batch_timed
+    return run_donut_batch_timed(images)
+
+def _warm_worker() -> float:
+    """Load the model in this worker and run one tiny generate; returns seconds taken."""
+    started = time.perf_counter()
+    from PIL import Image
+    from .donut_runtime import run_donut_batch
+    run_donut_batch([Image.new("RGB", DONUT_IMAGE_SIZE, "white")])  # same shape real (prepared) receipts have
+    return time.perf_counter() - started
+
+
+# ---------- pool + batching scheduler ----------
+
+@dataclass
+class _Request:
+    img: Any
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class InferencePool:
+    def __init__(
+        self,
+        workers: int,
+        torch_threads: int,
+        queue_max: int,
+        batch_max: int = 1,
+        batch_window_ms: int = 0,
+    ):
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.queue_max = max(1, queue_max)
+        self.batch_max = max(1, batch_max)
+        self.batch_window = max(0, batch_window_ms) / 1000.0
+        self._executor: Optional[Executor] = None
+        self._pending = 0  # only touched from the event loop thread
+
+        # created lazily on the running loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        # warm-up / model state: cold -> warming -> ready | failed
+        self.state = "cold"
+        self.warmup_error: Optional[str] = None
+        self.warmup_s: Optional[float] = None
+
+        # throughput / latency counters
+        self._batches = 0
+        self._items = 0
+        self._wait_s = 0.0   # sum of per-item queue wait
+        self._run_s = 0.0    # sum of per-batch generate wall time
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                # spawn: never fork a process that may already hold torch/OpenMP state
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix="donut",
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,),
+                )
+        return self._executor
+
+    def _ensure_collector(self) -> None:
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(max(1, self.workers))
+            self._collector = asyncio.create_task(self._collect())
+
+    def start(self) -> None:
+        self._get_executor()
+
+    async def warm_up(self) -> None:
+        """
+        Load Donut in every worker and run one dummy inference, so the first
+        receipt doesn't pay for process spawn, imports and model load. One
+        call per worker is submitted at once; each takes seconds, so idle
+        workers pick up one each.
+        """
+        self.state = "warming"
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, _warm_worker) for _ in range(max(1, self.workers))
+            ))
+        except Exception as e:
+            self.state = "failed"
+            self.warmup_error = f"{type(e).__name__}: {e}"
+            return
+        self.warmup_s = round(time.perf_counter() - started, 2)
+        self.state = "ready"
+
+    def shutdown(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, img) -> str:
+        """
+        Run Donut on one image in the pool. Raises InferenceBusy when the queue is full.
+
+        Queue wait and the worker's stage timings (preprocess, generate, decode
+        of the batch this image rode in) are recorded as metrics stages.
+        """
+        if self._pending >= self.queue_max:
+            raise InferenceBusy()
+        self._pending += 1
+        try:
+            self._ensure_collector()
+            fut = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait(_Request(img, fut))
+            text, stages = await fut
+            for name, seconds in stages.items():
+                metrics.add_stage(name, seconds)
+            return text
+        finally:
+            self._pending -= 1
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_max:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # wait for a free worker; whatever queued meanwhile rides along
+            await self._slots.acquire()
+            while len(batch) < self.batch_max and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[_Request]) -> None:
+        try:
+            live = [r for r in batch if not r.future.done()]  # callers may have gone away
+            if not live:
+                return
+            started = time.perf_counter()
+            try:
+                results, stages = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(), _infer_batch, [r.img for r in live]
+                )
+            except Exception as e:
+                for r in live:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+                return
+
+            self.state = "ready"  # at least one worker has the model loaded
+            self._batches += 1
+            self._items += len(live)
+            self._run_s += time.perf_counter() - started
+            self._wait_s += sum(started - r.enqueued for r in live)
+            for r, res in zip(live, results):
+                if not r.future.done():
+                    r.future.set_result((res, {"ocr_wait": started - r.enqueued, **stages}))
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._batches or 1
+        items = self._items or 1
+        return {
+            "state": self.state,
+            "warmup_s": self.warmup_s,
+            "warmup_error": self.warmup_error,
+            "workers": self.workers,
+            "torch_threads": self.torch_threads,
+            "queue_max": self.queue_max,
+            "pending": self._pending,
+            "batch_max": self.batch_max,
+            "batch_window_ms": round(self.batch_window * 1000),
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / batches, 2),
+            "avg_queue_wait_ms": round(self._wait_s / items * 1000, 1),
+            "avg_batch_ms": round(self._run_s / batches * 1000, 1),
+            # generate cost amortised per receipt: the number batching lowers
+            "avg_item_ms": round(self._run_s / items * 1000, 1),
+            # receipts per second of worker busy time
+            "items_per_busy_s": round(self._items / self._run_s, 2) if self._run_s else 0.0,
+        }
+
+
+inference_pool = InferencePool(
+    OCR_WORKERS, OCR_TORCH_THREADS, OCR_QUEUE_MAX,
+    batch_max=OCR_BATCH_MAX, batch_window_ms=OCR_BATCH_WINDOW_MS,
+)
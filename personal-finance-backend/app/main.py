@@ -1,13 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 from sqlmodel import Session
 
-from .db import create_db_and_tables, engine
+from .config import DB_ASYNC, OCR_WARMUP, RECEIPT_MAX_UPLOAD_MB
+from .db import create_db_and_tables, dispose_async_engine, write_engine
 from .seed import seed_categories
+from .inference import inference_pool
+from .receipt_cache import receipt_cache
+from .category_registry import category_registry
+from .data_version import response_cache
+from .core import metrics
+from .core.limits import BodySizeLimitMiddleware
+from .core.principal_cache import principal_cache
+from .core.security import hashing_pool
 from .routers.transactions import router as transactions_router
 from .routers.categories import router as categories_router
 from .routers.summary import router as summary_router
-from .routers.receipt import router as receipt_router
+from .routers.receipt import router as receipt_router, start_warmup, stop_warmup
 from .routers.auth import router as auth_router
+from .routers.metrics import router as metrics_router
+from .routers.async_variants import async_variant
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -17,22 +30,69 @@ origins = [
     "*"
 ]
 
+# inside CORS so a 413 still carries the CORS headers; receipt uploads are bounded
+# while they stream in, not after they have been spooled
+app.add_middleware(
+    BodySizeLimitMiddleware, max_bytes=RECEIPT_MAX_UPLOAD_MB * 1024 * 1024, prefixes=["/extract/receipt"],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,           # or ["*"] during development
     allow_credentials=True,          # if you use cookies/auth headers
     allow_methods=["*"],             # GET, POST, PUT, etc.
     allow_headers=["*"],             # Authorization, Content-Type, etc.
+    expose_headers=["Server-Timing"],
 )
 
+# outermost: times everything, including CORS preflights
+app.add_middleware(metrics.MetricsMiddleware)
+
+for prefix, stats in (
+    ("pfa_inference", inference_pool.stats),
+    ("pfa_receipt_cache", receipt_cache.stats),
+    ("pfa_hashing", hashing_pool.stats),
+    ("pfa_principal_cache", principal_cache.stats),
+    ("pfa_category_registry", category_registry.stats),
+    ("pfa_response_cache", response_cache.stats),
+):
+    metrics.register_stats(prefix, stats)
+
+@app.exception_handler(OperationalError)
+async def database_busy(request: Request, exc: OperationalError):
+    # SQLite write lock still taken after busy_timeout: the client may retry
+    if "database is locked" not in str(exc.orig):
+        raise exc
+    return JSONResponse(
+        status_code=503, content={"detail": "Database busy, please retry shortly."}, headers={"Retry-After": "1"},
+    )
+
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
-    with Session(engine) as session:
+    with Session(write_engine) as session:
         seed_categories(session)
 
+@app.on_event("startup")
+async def on_startup_ocr():
+    if OCR_WARMUP:
+        start_warmup()  # background; the API serves requests meanwhile
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    stop_warmup()
+    inference_pool.shutdown()
+    hashing_pool.shutdown()
+    await dispose_async_engine()
+
 app.include_router(auth_router)
 
+if DB_ASYNC:
+    # same routes as async def on an AsyncSession (aiosqlite / asyncpg)
+    transactions_router = async_variant(transactions_router)
+    categories_router = async_variant(categories_router)
+    summary_router = async_variant(summary_router)
+
 app.include_router(transactions_router)
 
 app.include_router(categories_router)
@@ -41,7 +101,18 @@ app.include_router(summary_router)
 
 app.include_router(receipt_router)
 
+app.include_router(metrics_router)
+
 @app.get("/")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def readiness(response: Response):
+    """503 while OCR_WARMUP is still loading the model; `ocr` is cold | warming | ready | failed."""
+    ocr = {"state": inference_pool.state, "warmup_s": inference_pool.warmup_s, "error": inference_pool.warmup_error}
+    if inference_pool.state == "warming":
+        response.status_code = 503
+        return {"status": "starting", "ocr": ocr}
+    return {"status": "ready", "ocr": ocr}
+
@@ -2,6 +2,7 @@ from datetime import datetime, date
 from typing import Optional, Literal
 from enum import Enum
 
+from sqlalchemy import CheckConstraint, Index, text
 from sqlmodel import SQLModel, Field, Relationship
 
 # ---------- Users ----------
@@ -31,6 +32,9 @@ class CategoryBase(SQLModel):
 
 class Category(CategoryBase, table=True):
     __tablename__ = "categories"
+    __table_args__ = (
+        Index("ix_categories_user_name", "user_id", "name"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(default=None, foreign_key="users.id")  # NULL => global/default
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -58,6 +62,12 @@ class TransactionBase(SQLModel):
 
 class Transaction(TransactionBase, table=True):
     __tablename__ = "transactions"
+    # Access paths (see migrations/versions/0002_access_path_indexes.py)
+    __table_args__ = (
+        Index("ix_transactions_user_date_id", "user_id", "date", "id"),
+        Index("ix_transactions_user_category_date_id", "user_id", "category_id", "date", "id"),
+        Index("ix_transactions_user_type_date", "user_id", "type", "date", "category_id", "amount_minor"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -74,3 +84,30 @@ class TransactionRead(TransactionBase):
     user_id: int
     created_at: datetime
     updated_at: datetime
+
+# ---------- Monthly rollups ----------
+
+class MonthlyRollup(SQLModel, table=True):
+    """Per (user, month, category, type) totals kept in step with `transactions` (see app/rollup.py)."""
+    __tablename__ = "monthly_rollups"
+    __table_args__ = (
+        Index("ix_monthly_rollups_user_type_month", "user_id", "type", "year_month", "category_id"),
+        # one row per bucket; NULL (income) categories compare equal
+        Index("ux_monthly_rollups_bucket", "user_id", "type", "year_month", text("coalesce(category_id, -1)"), unique=True),
+        CheckConstraint("count >= 0", name="ck_monthly_rollups_count_nonneg"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
+    year_month: str = Field(nullable=False)  # 'YYYY-MM'
+    category_id: Optional[int] = Field(default=None, foreign_key="categories.id")
+    type: TxnType
+    sum_minor: int = Field(default=0, nullable=False)  # paise
+    count: int = Field(default=0, nullable=False)
+
+# ---------- Per-user data version ----------
+
+class UserDataVersion(SQLModel, table=True):
+    """Bumped by every write that changes a user's read endpoints; drives ETags (see app/data_version.py)."""
+    __tablename__ = "user_data_versions"
+    user_id: int = Field(primary_key=True, foreign_key="users.id")
+    version: int = Field(default=0, nullable=False)
@@ -0,0 +1,83 @@
+"""
+PDF ingestion for receipt extraction.
+
+Digital PDFs (e-receipts, invoices) are read straight from their text layer
+with pdfplumber; only when that yields nothing usable do we rasterize.
+
+Only pages 1..OCR_MAX_PAGES are rendered, at PDF_RASTER_DPI, one page per
+pdftoppm call. Up to PDF_RASTER_THREADS pages render ahead in parallel while
+the caller consumes them in order, so at most that many full-resolution pages
+are alive at once (instead of the whole document as a list). Each page leaves
+the render thread already cropped and fitted to the Donut input size
+(image_prep.prepare_page).
+
+Both take an optional `stop` event: the receipt router sets it when the
+request's deadline passes, and no further page is read or rendered (the page
+in progress finishes in the background).
+"""
+from __future__ import annotations
+import io
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+import pdfplumber
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+from pdf2image.exceptions import PDFPageCountError
+from PIL import Image
+
+from .config import PDF_RASTER_DPI, OCR_MAX_PAGES, PDF_RASTER_THREADS
+from .image_prep import prepare_page
+
+
+def extract_pdf_text(raw: bytes, max_pages: int = OCR_MAX_PAGES, stop: Optional[threading.Event] = None) -> str:
+    """Text layer of pages 1..max_pages ('' for scanned/image-only PDFs)."""
+    texts = []
+    with pdfplumber.open(io.BytesIO(raw)) as pdf:
+        for page in pdf.pages[: max(1, max_pages)]:
+            if stop is not None and stop.is_set():
+                break
+            texts.append(page.extract_text() or "")
+    return "\n".join(texts)
+
+def pdf_page_count(raw: bytes) -> int:
+    return int(pdfinfo_from_bytes(raw)["Pages"])
+
+def _render_page(raw: bytes, page_no: int, dpi: int) -> Image.Image:
+    # default ppm output: no PNG encode/decode round trip
+    pages = convert_from_bytes(raw, dpi=dpi, first_page=page_no, last_page=page_no)
+    if not pages:
+        raise PDFPageCountError(f"pdftoppm rendered nothing for page {page_no}")
+    return prepare_page(pages[0])
+
+def iter_pdf_pages(
+    raw: bytes,
+    dpi: int = PDF_RASTER_DPI,
+    max_pages: int = OCR_MAX_PAGES,
+    threads: int = PDF_RASTER_THREADS,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[Image.Image]:
+    """Yield rendered, Donut-sized pages in order; renders at most `threads` pages ahead."""
+    stop = stop or threading.Event()
+    last = min(pdf_page_count(raw), max(1, max_pages))
+    threads = max(1, threads)
+
+    ex = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pdf-raster")
+    ahead: deque = deque()
+    next_page = 1
+    try:
+        while (ahead or next_page <= last) and not stop.is_set():
+            while next_page <= last and len(ahead) < threads:
+                ahead.append(ex.submit(_render_page, raw, next_page, dpi))
+                next_page += 1
+            page = ahead.popleft().result()
+            if stop.is_set():
+                return
+            yield page
+    finally:
+        # consumer stopped early (error, deadline): drop pages not yet started and
+        # don't wait for the ones rendering, their threads exit when done
+        for fut in ahead:
+            fut.cancel()
+        ex.shutdown(wait=False)
@@ -0,0 +1,132 @@
+"""
+Content-addressed cache for receipt extraction results.
+
+Key = sha256(upload bytes) + model id + parser version, so a re-uploaded
+receipt skips rasterize + Donut + parsing entirely, and a model or parser
+change never serves stale output.
+
+Two tiers: a small in-memory LRU, and JSON files on disk (survive restarts
+and are shared between API workers) bounded by total size, oldest first out.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .config import RECEIPT_CACHE_DIR, RECEIPT_CACHE_MEM_ITEMS, RECEIPT_CACHE_DISK_MB
+
+
+def cache_key(raw: bytes, model_id: str, parser_version: int, variant: str = "") -> str:
+    """`variant` carries input settings that change the result (e.g. PDF dpi / page limit)."""
+    h = hashlib.sha256(raw)
+    h.update(f"\0{model_id}\0{parser_version}\0{variant}".encode())
+    return h.hexdigest()
+
+
+class ReceiptCache:
+    def __init__(self, directory: Path, mem_items: int, disk_bytes: int):
+        self.directory = Path(directory)
+        self.mem_items = mem_items
+        self.disk_bytes = disk_bytes
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_used: Optional[int] = None  # computed on first disk access
+
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- helpers ----------
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _scan_disk(self) -> int:
+        if self._disk_used is None:
+            self._disk_used = sum(p.stat().st_size for p in self.directory.glob("*/*.json"))
+        return self._disk_used
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_items:
+            self._mem.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        if self._scan_disk() <= self.disk_bytes:
+            return
+        files = sorted(self.directory.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        for p in files:
+            if self._disk_used <= self.disk_bytes:
+                break
+            try:
+                size = p.stat().st_size
+                p.unlink()
+            except FileNotFoundError:
+                continue
+            self._disk_used -= size
+            self.evictions += 1
+
+    # ---------- API ----------
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Returns (value, tier) where tier is 'memory', 'disk' or 'miss'."""
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.mem_hits += 1
+                return self._mem[key], "memory"
+
+            path = self._path(key)
+            try:
+                value = json.loads(path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                self.misses += 1
+                return None, "miss"
+
+            os.utime(path)  # mtime doubles as last-used for disk eviction
+            self._remember(key, value)
+            self.disk_hits += 1
+            return value, "disk"
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._remember(key, value)
+            if self.disk_bytes <= 0 or len(data) > self.disk_bytes:
+                return
+
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+            old = path.stat().st_size if path.exists() else 0
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)  # readers never see a half-written file
+            self._disk_used += len(data) - old
+            self._evict_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.mem_hits + self.disk_hits + self.misses
+        return {
+            "mem_hits": self.mem_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.mem_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "mem_items": len(self._mem),
+            "disk_bytes": self._scan_disk(),
+            "disk_limit_bytes": self.disk_bytes,
+        }
+
+
+receipt_cache = ReceiptCache(
+    RECEIPT_CACHE_DIR,
+    mem_items=RECEIPT_CACHE_MEM_ITEMS,
+    disk_bytes=RECEIPT_CACHE_DISK_MB * 1024 * 1024,
+)
@@ -0,0 +1,106 @@
+"""
+In-process store for asynchronous receipt extraction jobs.
+
+Bounded (RECEIPT_JOBS_MAX) and TTL-expired (RECEIPT_JOB_TTL_S after the job
+finished). Each job keeps its stage events so SSE subscribers that connect
+late still see the whole history.
+"""
+from __future__ import annotations
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .config import RECEIPT_JOBS_MAX, RECEIPT_JOB_TTL_S
+
+
+class JobStoreFull(Exception):
+    """Raised when every slot holds a job that is still running."""
+
+
+@dataclass
+class ReceiptJob:
+    id: str
+    status: str = "queued"          # queued | running | done | failed
+    stage: str = "queued"           # queued | rasterized | decoding | parsed | done | failed
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def emit(self, stage: str, **data: Any) -> None:
+        self.stage = stage
+        self.events.append({"stage": stage, "t": round(time.time() - self.created_at, 3), **data})
+        # wake every waiter, then arm a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def succeed(self, result: Dict[str, Any]) -> None:
+        self.result = result
+        self.status = "done"
+        self.finished_at = time.time()
+        self.emit("done")
+
+    def fail(self, status_code: int, detail: Any) -> None:
+        self.error = {"status_code": status_code, "detail": detail}
+        self.status = "failed"
+        self.finished_at = time.time()
+        self.emit("failed", **self.error)
+
+    async def wait_change(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def public(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobStore:
+    def __init__(self, max_jobs: int, ttl_s: int):
+        self.max_jobs = max(1, max_jobs)
+        self.ttl_s = ttl_s
+        self._jobs: "OrderedDict[str, ReceiptJob]" = OrderedDict()
+
+    def _purge(self) -> None:
+        now = time.time()
+        expired = [
+            jid for jid, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.ttl_s
+        ]
+        for jid in expired:
+            del self._jobs[jid]
+
+    def create(self) -> ReceiptJob:
+        self._purge()
+        if len(self._jobs) >= self.max_jobs:
+            # make room by dropping the oldest finished job
+            oldest_done = next((jid for jid, j in self._jobs.items() if j.finished), None)
+            if oldest_done is None:
+                raise JobStoreFull()
+            del self._jobs[oldest_done]
+        job = ReceiptJob(id=uuid.uuid4().hex)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ReceiptJob]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+
+receipt_jobs = JobStore(RECEIPT_JOBS_MAX, RECEIPT_JOB_TTL_S)
@@ -0,0 +1,201 @@
+"""
+Receipt parsers: Donut CORD markup and PDF text layers.
+
+Both return the same shape:
+  { items: [{name, price}], total: float|None, date: 'YYYY-MM-DD'|None }
+
+parse_cord_items tokenizes the markup in a single pass (one compiled regex
+for every tag we care about) instead of compiling and running three
+`<tag>(.*?)</tag>` searches per block. Output is identical to the old
+per-block regex parser; benchmarks/cord_parser.py checks that on a corpus.
+"""
+from __future__ import annotations
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bump whenever parser output changes, so cached extraction results are not reused.
+PARSER_VERSION = 2
+
+# ---------- shared helpers ----------
+
+TAG_RE = re.compile(r"</?[^>]+>")  # to strip tags when needed
+
+DEC_COMMA_RE = re.compile(r"\d+,\d{2}\b")
+GROUP_DOT_SPACE_RE = re.compile(r"(?<=\d)[.\s](?=\d{3}\b)")
+GROUP_COMMA_SPACE_RE = re.compile(r"(?<=\d)[,\s](?=\d{3}\b)")
+NUMBER_RE = re.compile(r"\d+(?:\.\d{1,2})?")
+
+def _dec_to_float(s: str) -> Optional[float]:
+    """Handle both 235.10 and 235,10; tolerate group separators."""
+    s = s.strip()
+    if not s:
+        return None
+    # decimal comma -> dot (but first remove group separators like '.' or spaces)
+    if DEC_COMMA_RE.search(s):
+        tmp = GROUP_DOT_SPACE_RE.sub("", s)
+        tmp = tmp.replace(",", ".")
+        m = NUMBER_RE.search(tmp)
+        return float(m.group(0)) if m else None
+    # decimal point path (remove comma/space grouping)
+    tmp = GROUP_COMMA_SPACE_RE.sub("", s)
+    m = NUMBER_RE.search(tmp)
+    return float(m.group(0)) if m else None
+
+META_KEYWORDS = [
+    "sum", "total", "varer", "bank", "mva", "vat", "tax", "kontant", "kort",
+    "authorized", "autoriser", "kasse", "kvitt", "resultat", "kopi", "psn",
+    "ref", "arc", "aid", "tid", "terminal", "operator", "time",
+    "takk", "thanks", "receipt", "invoice",
+]
+# one alternation scan instead of a Python loop over keywords
+META_RE = re.compile("|".join(map(re.escape, META_KEYWORDS)))
+
+def _looks_like_total_or_meta(text: str) -> bool:
+    return META_RE.search(text.lower()) is not None
+
+DATE_PATTERNS = [
+    r"\b(\d{4})-(\d{2})-(\d{2})\b",      # 2023-10-02
+    r"\b(\d{2})[.\-\/](\d{2})[.\-\/](\d{2,4})\b",  # 02.10.23 or 02-10-2023
+]
+ISO_DATE_RE = re.compile(DATE_PATTERNS[0])
+DMY_DATE_RE = re.compile(DATE_PATTERNS[1])
+
+def _extract_date_from_raw(raw: str) -> Optional[str]:
+    # Prefer ISO yyyy-mm-dd first
+    m = ISO_DATE_RE.search(raw)
+    if m:
+        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
+    m = DMY_DATE_RE.search(raw)
+    if m:
+        d1, d2, d3 = m.groups()
+        if len(d3) == 2:  # yy -> 20yy
+            d3 = "20" + d3
+        try:
+            return f"{int(d3):04d}-{int(d2):02d}-{int(d1):02d}"
+        except Exception:
+            return None
+    return None
+
+# ---------- CORD markup parser ----------
+
+CORD_FIELDS = ("s_nm", "s_unitprice", "s_price")
+CORD_TOKEN_RE = re.compile(r"<sep/>|<(/?)(s_nm|s_unitprice|s_price)>")
+NUMERIC_ONLY_RE = re.compile(r"[0-9\s\-\.:]+")
+
+def _cord_events(raw: str) -> Iterator[Tuple[Optional[str], str]]:
+    """
+    Yields (tag, inner text) for every closed s_nm / s_unitprice / s_price,
+    and (None, "") at each <sep/> and at the end.
+
+    Per tag, the first open is matched with the next close and anything in
+    between (other tags included) is the value, exactly like a non-greedy
+    `<tag>(.*?)</tag>` search; unclosed tags yield nothing.
+    """
+    open_at: Dict[str, int] = {}
+    for m in CORD_TOKEN_RE.finditer(raw):
+        closing, tag = m.group(1), m.group(2)
+        if tag is None:  # <sep/>: block boundary
+            open_at.clear()
+            yield None, ""
+        elif not closing:
+            open_at.setdefault(tag, m.end())
+        elif tag in open_at:
+            yield tag, raw[open_at.pop(tag):m.start()].strip()
+    yield None, ""
+
+def parse_cord_items(raw: str) -> Dict[str, Any]:
+    """
+    Returns:
+      { items: [{name, price}], total: float|None, date: 'YYYY-MM-DD'|None }
+    """
+    items: List[Dict[str, Any]] = []
+    total: Optional[float] = None
+
+    names: List[str] = []
+    last_price: Optional[str] = None       # last non-empty <s_price> in the block
+    last_unitprice: Optional[str] = None   # last non-empty <s_unitprice> in the block
+
+    for tag, value in _cord_events(raw):
+        if tag == "s_nm":
+            names.append(value)
+            continue
+        if tag == "s_price":
+            if value:
+                last_price = value
+            continue
+        if tag == "s_unitprice":
+            if value:
+                last_unitprice = value
+            continue
+
+        # ---- end of block ----
+        # Same pick as before: a unitprice wins over price when both exist
+        last_num = last_unitprice or last_price
+        price_val = _dec_to_float(last_num) if last_num else None
+
+        # Pick a plausible name: last <s_nm> that isn't meta-ish
+        name = None
+        is_total = False
+        for cand in reversed(names):
+            if "total" in cand.lower():
+                is_total = True  # "total" is a meta keyword, so never a name either
+                continue
+            # skip obvious numeric-only or meta-ish lines
+            if name or _looks_like_total_or_meta(cand) or NUMERIC_ONLY_RE.fullmatch(cand):
+                continue
+            # clean nested tags if any
+            name = TAG_RE.sub("", cand).strip() or None
+
+        names.clear()
+        last_price = last_unitprice = None
+
+        # Identify totals explicitly
+        if is_total and price_val:
+            # capture overall total (doesn't go into items)
+            if (total is None) or (price_val > total):
+                total = price_val
+            continue
+
+        # Add item when we have both
+        if name and price_val is not None:
+            items.append({"name": name, "price": price_val})
+
+    date = _extract_date_from_raw(raw)
+    return {"items": items, "total": total, "date": date}
+
+# ---------- PDF text-layer parser ----------
+
+# "<name> [currency] <amount with 2 decimals>" at the end of a line
+TEXT_LINE_RE = re.compile(
+    r"^(?P<name>.*?[A-Za-z].*?)\s+(?:(?:Rs\.?|INR|₹|\$|€)\s*)?"
+    r"(?P<amount>(?:\d{1,3}(?:[.,\s]\d{3})+|\d+)[.,]\d{2})\s*$"
+)
+QTY_PREFIX_RE = re.compile(r"^\d+\s*[xX×]\s+")
+
+def parse_text_items(text: str) -> Dict[str, Any]:
+    """
+    Same shape as parse_cord_items, from a PDF text layer:
+      { items: [{name, price}], total: float|None, date: 'YYYY-MM-DD'|None }
+    """
+    items: List[Dict[str, Any]] = []
+    total: Optional[float] = None
+
+    for line in text.splitlines():
+        m = TEXT_LINE_RE.match(line.strip())
+        if not m:
+            continue
+        name = QTY_PREFIX_RE.sub("", m.group("name")).strip(" .:-")
+        price_val = _dec_to_float(m.group("amount"))
+        if price_val is None or not name:
+            continue
+
+        if _looks_like_total_or_meta(name):
+            if "total" in name.lower() and ((total is None) or (price_val > total)):
+                total = price_val
+            continue
+        # "Date: 02.10.23" style lines look like "<name> <amount>" too
+        if ISO_DATE_RE.search(line) or DMY_DATE_RE.search(line):
+            continue
+        items.append({"name": name, "price": price_val})
+
+    return {"items": items, "total": total, "date": _extract_date_from_raw(text)}
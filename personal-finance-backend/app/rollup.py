@@ -0,0 +1,201 @@
+"""
+Monthly rollup maintenance.
+
+`monthly_rollups` holds SUM(amount_minor) / COUNT(*) per
+(user_id, year_month, category_id, type). Every transaction write path calls
+into here before its commit, so the rollup changes in the same DB
+transaction as the rows it summarises.
+
+Check or rebuild against the raw rows:
+
+    python -m app.rollup verify [--user-id N]
+    python -m app.rollup rebuild [--user-id N]
+"""
+from __future__ import annotations
+import argparse
+import sys
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from .models import MonthlyRollup, Transaction, TxnType
+
+# (user_id, 'YYYY-MM', category_id, type)
+RollupKey = Tuple[int, str, Optional[int], TxnType]
+# (sum_minor delta, count delta)
+Delta = Tuple[int, int]
+
+
+def year_month(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+def key_of(tx: Transaction) -> RollupKey:
+    return (tx.user_id, year_month(tx.date), tx.category_id, TxnType(tx.type))
+
+def snapshot(tx: Transaction) -> Tuple[RollupKey, int]:
+    """Rollup key + amount of a row *before* it is modified (for record_update)."""
+    return key_of(tx), tx.amount_minor
+
+# ---------- applying deltas ----------
+
+def _key_filter(key: RollupKey):
+    user_id, ym, category_id, txn_type = key
+    return (
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.type == txn_type,
+        MonthlyRollup.year_month == ym,
+        MonthlyRollup.category_id.is_not_distinct_from(category_id),  # NULL-safe
+    )
+
+# conflict target: the expression of the unique index ux_monthly_rollups_bucket (NULL category = -1)
+_BUCKET = ["user_id", "type", "year_month", text("coalesce(category_id, -1)")]
+
+def _add(session: Session, dialect: str, key: RollupKey, d_sum: int, d_count: int) -> None:
+    user_id, ym, category_id, txn_type = key
+    values = dict(user_id=user_id, year_month=ym, category_id=category_id, type=txn_type, sum_minor=d_sum, count=d_count)
+    if d_count > 0 and dialect in ("sqlite", "postgresql"):
+        # one statement: concurrent first writes to a bucket can't both insert. Only adds
+        # create buckets; the CHECK applies to the proposed row, so removals are plain UPDATEs
+        ins = (sqlite_insert if dialect == "sqlite" else pg_insert)(MonthlyRollup).values(**values)
+        session.exec(ins.on_conflict_do_update(
+            index_elements=_BUCKET,
+            set_={"sum_minor": MonthlyRollup.sum_minor + ins.excluded.sum_minor,
+                  "count": MonthlyRollup.count + ins.excluded.count},
+        ))
+        return
+    res = session.exec(
+        update(MonthlyRollup)
+        .where(*_key_filter(key))
+        .values(sum_minor=MonthlyRollup.sum_minor + d_sum, count=MonthlyRollup.count + d_count)
+    )
+    if res.rowcount == 0:
+        # the unique index rejects a racing twin; a removal from a missing bucket fails the CHECK
+        session.exec(insert(MonthlyRollup).values(**values))
+
+def apply_deltas(session: Session, deltas: Dict[RollupKey, Delta]) -> None:
+    """
+    Add deltas to their buckets. A count that would go below zero violates
+    ck_monthly_rollups_count_nonneg and fails the write instead of drifting.
+    """
+    dialect = session.get_bind().dialect.name
+    for key, (d_sum, d_count) in deltas.items():
+        if d_sum == 0 and d_count == 0:
+            continue
+        _add(session, dialect, key, d_sum, d_count)
+        if d_count < 0:
+            # last transaction of that bucket went away; a bucket left with count 0 but a
+            # sum is drift and stays for `verify` to report
+            session.exec(delete(MonthlyRollup).where(
+                *_key_filter(key), MonthlyRollup.count == 0, MonthlyRollup.sum_minor == 0,
+            ))
+
+def record_insert(session: Session, txs: Iterable[Transaction]) -> None:
+    deltas: Dict[RollupKey, Delta] = defaultdict(lambda: (0, 0))
+    for tx in txs:
+        s, c = deltas[key_of(tx)]
+        deltas[key_of(tx)] = (s + tx.amount_minor, c + 1)
+    apply_deltas(session, deltas)
+
+def record_insert_rows(session: Session, rows: Iterable[Mapping[str, Any]]) -> None:
+    """Same as record_insert, for plain column dicts (Core bulk insert path)."""
+    deltas: Dict[RollupKey, Delta] = defaultdict(lambda: (0, 0))
+    for row in rows:
+        key = (row["user_id"], year_month(row["date"]), row["category_id"], TxnType(row["type"]))
+        s, c = deltas[key]
+        deltas[key] = (s + row["amount_minor"], c + 1)
+    apply_deltas(session, deltas)
+
+def record_delete(session: Session, tx: Transaction) -> None:
+    apply_deltas(session, {key_of(tx): (-tx.amount_minor, -1)})
+
+def record_update(session: Session, before: Tuple[RollupKey, int], tx: Transaction) -> None:
+    """Handles moves between months, categories and types as remove + add."""
+    old_key, old_amount = before
+    new_key = key_of(tx)
+    if old_key == new_key:
+        apply_deltas(session, {new_key: (tx.amount_minor - old_amount, 0)})
+    else:
+        apply_deltas(session, {old_key: (-old_amount, -1), new_key: (tx.amount_minor, 1)})
+
+# ---------- verify / rebuild ----------
+
+def compute_from_raw(session: Session, user_id: Optional[int] = None) -> Dict[RollupKey, Delta]:
+    """Rollup recomputed from `transactions` (grouped per day in SQL, folded into months here)."""
+    stmt = select(
+        Transaction.user_id, Transaction.date, Transaction.category_id, Transaction.type,
+        func.sum(Transaction.amount_minor), func.count(),
+    ).group_by(Transaction.user_id, Transaction.date, Transaction.category_id, Transaction.type)
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+
+    out: Dict[RollupKey, Delta] = defaultdict(lambda: (0, 0))
+    for uid, d, category_id, txn_type, sum_minor, count in session.exec(stmt):
+        key = (uid, year_month(d), category_id, TxnType(txn_type))
+        s, c = out[key]
+        out[key] = (s + int(sum_minor), c + int(count))
+    return dict(out)
+
+def load_rollup(session: Session, user_id: Optional[int] = None) -> Dict[RollupKey, Delta]:
+    stmt = select(MonthlyRollup)
+    if user_id is not None:
+        stmt = stmt.where(MonthlyRollup.user_id == user_id)
+    return {
+        (r.user_id, r.year_month, r.category_id, TxnType(r.type)): (r.sum_minor, r.count)
+        for r in session.exec(stmt)
+    }
+
+def verify(session: Session, user_id: Optional[int] = None) -> Dict[RollupKey, Tuple[Optional[Delta], Optional[Delta]]]:
+    """
+    Keys where rollup and raw data disagree: {key: (rollup, raw)}. A negative
+    rollup count never matches raw data, so it always shows up here.
+    """
+    expected = compute_from_raw(session, user_id)
+    actual = load_rollup(session, user_id)
+    return {
+        k: (actual.get(k), expected.get(k))
+        for k in expected.keys() | actual.keys()
+        if actual.get(k) != expected.get(k)
+    }
+
+def rebuild(session: Session, user_id: Optional[int] = None) -> int:
+    """Replace rollup rows from raw data in one transaction. Returns rows written."""
+    expected = compute_from_raw(session, user_id)
+    stmt = delete(MonthlyRollup)
+    if user_id is not None:
+        stmt = stmt.where(MonthlyRollup.user_id == user_id)
+    session.exec(stmt)
+    session.add_all(
+        MonthlyRollup(user_id=uid, year_month=ym, category_id=cid, type=t, sum_minor=s, count=c)
+        for (uid, ym, cid, t), (s, c) in expected.items()
+    )
+    session.commit()
+    return len(expected)
+
+
+def main() -> None:
+    from .db import engine, write_engine
+
+    ap = argparse.ArgumentParser(description="Check or rebuild monthly_rollups from transactions.")
+    ap.add_argument("action", choices=["verify", "rebuild"])
+    ap.add_argument("--user-id", type=int, default=None)
+    args = ap.parse_args()
+
+    with Session(write_engine if args.action == "rebuild" else engine) as session:
+        if args.action == "rebuild":
+            print(f"rebuilt {rebuild(session, args.user_id)} rollup rows")
+            return
+        diffs = verify(session, args.user_id)
+        for key, (rollup_val, raw_val) in sorted(diffs.items(), key=lambda kv: str(kv[0])):
+            negative = " NEGATIVE COUNT" if rollup_val is not None and rollup_val[1] < 0 else ""
+            print(f"{key}: rollup={rollup_val} raw={raw_val}{negative}")
+        print("rollup matches raw data" if not diffs else f"{len(diffs)} mismatched rollup rows")
+        sys.exit(1 if diffs else 0)
+
+
+if __name__ == "__main__":
+    main()
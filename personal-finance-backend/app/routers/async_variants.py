@@ -0,0 +1,72 @@
+"""
+`async def` variants of the sync DB routers (enabled with DB_ASYNC=1).
+
+Every sync endpoint that takes `session: Session = Depends(get_session)` is
+re-registered as an async endpoint that takes an AsyncSession and runs the
+original body through `AsyncSession.run_sync`. The handler code (validation,
+rollup upkeep, queries) stays in one place. Its DB calls go through the async
+driver, so a request waiting on the database holds no thread from the pool.
+
+Endpoints that are already async, or that don't use `session`, are mounted
+unchanged.
+"""
+import inspect
+from typing import Any, Callable
+
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..db import get_async_session, get_session
+
+
+def _uses_sync_session(endpoint: Callable[..., Any]) -> bool:
+    if inspect.iscoroutinefunction(endpoint):
+        return False
+    param = inspect.signature(endpoint).parameters.get("session")
+    return param is not None and getattr(param.default, "dependency", None) is get_session
+
+def _async_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    sig = inspect.signature(endpoint, eval_str=True)
+    params = [
+        p.replace(annotation=AsyncSession, default=Depends(get_async_session)) if p.name == "session" else p
+        for p in sig.parameters.values()
+    ]
+
+    async def wrapper(**kwargs: Any) -> Any:
+        session: AsyncSession = kwargs.pop("session")
+        return await session.run_sync(lambda sync_session: endpoint(session=sync_session, **kwargs))
+
+    wrapper.__signature__ = sig.replace(parameters=params)
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__qualname__ = endpoint.__qualname__
+    wrapper.__doc__ = endpoint.__doc__
+    return wrapper
+
+def async_variant(router: APIRouter) -> APIRouter:
+    """Same paths, models and status codes as `router`, async endpoints."""
+    out = APIRouter()
+    for route in router.routes:
+        if not isinstance(route, APIRoute):
+            out.routes.append(route)
+            continue
+        endpoint = _async_endpoint(route.endpoint) if _uses_sync_session(route.endpoint) else route.endpoint
+        out.add_api_route(
+            route.path,
+            endpoint,
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=route.dependencies,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            deprecated=route.deprecated,
+            operation_id=route.operation_id,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+            name=route.name,
+        )
+    return out
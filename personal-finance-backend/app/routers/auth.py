@@ -1,29 +1,74 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 
-from ..db import get_session
+from ..db import engine, get_session
 from ..models import User
 from ..schemas import Token, UserCreate, UserRead
 from ..core.security import (
-    verify_password, get_password_hash,
+    hash_password_async, verify_and_update_password,
     create_access_token, decode_access_token,
+    HashingBusy,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
+from ..core.principal_cache import Principal, principal_cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 # --- Helpers ---
-def authenticate_user(session: Session, email: str, password: str) -> User | None:
-    user = session.exec(select(User).where(User.email == email)).first()
-    if not user or not verify_password(password, user.password_hash):  # <-- fixed
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many logins in progress, please retry shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+def _user_by_email(session: Session, email: str) -> User | None:
+    return session.exec(select(User).where(User.email == email)).first()
+
+def _lookup(session: Session, email: str) -> User | None:
+    """_user_by_email, then release the connection: no (write) transaction stays open while bcrypt runs."""
+    user = _user_by_email(session, email)
+    session.close()
+    return user
+
+def _save(session: Session, user: User) -> User:
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+async def authenticate_user(session: Session, email: str, password: str) -> User | None:
+    """bcrypt runs in the hashing pool; a hash at another cost is upgraded on success."""
+    user = await run_in_threadpool(_lookup, session, email)
+    if not user:
+        return None
+    try:
+        ok, new_hash = await verify_and_update_password(password, user.password_hash)
+    except HashingBusy:
+        raise _busy()
+    if not ok:
         return None
+    if new_hash:
+        user.password_hash = new_hash
+        user = await run_in_threadpool(_save, session, user)
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
+def _load_principal(user_id: int) -> Principal | None:
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        return Principal.from_user(user) if user else None
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    # async so a cache hit costs no thread-pool hop (and no session) per request
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     payload = decode_access_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -32,33 +77,36 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid user id in token")
 
-    user = session.get(User, user_id)
-    if not user:
+    principal = await run_in_threadpool(_load_principal, user_id)
+    if not principal:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 
 # --- Routes ---
 @router.post("/register", response_model=UserRead, status_code=201)
-def register(user_in: UserCreate, session: Session = Depends(get_session)):
-    exists = session.exec(select(User).where(User.email == user_in.email)).first()
+async def register(user_in: UserCreate, session: Session = Depends(get_session)):
+    exists = await run_in_threadpool(_lookup, session, user_in.email)
     if exists:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    try:
+        password_hash = await hash_password_async(user_in.password)
+    except HashingBusy:
+        raise _busy()
+
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
-        password_hash=get_password_hash(user_in.password),  # <-- fixed
+        password_hash=password_hash,
     )
-
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return user
+    return await run_in_threadpool(_save, session, user)
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = authenticate_user(session, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+    user = await authenticate_user(session, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -3,8 +3,11 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select, SQLModel
 
+from .. import data_version
+from ..category_registry import category_registry
 from ..db import get_session
-from ..models import Category, User
+from ..models import Category
+from ..core.principal_cache import Principal
 from ..routers.auth import get_current_user
 
 
@@ -28,32 +31,19 @@ class CategoryCreateIn(SQLModel):
 @router.get("", response_model=List[CategoryOut])
 def list_categories(
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     # user_id: Optional[int] = Query(None, description="If provided, return user's categories; optionally include global"),
     include_global: bool = Query(True, description="Include global (user_id = NULL) categories when user_id is provided"),
     q: Optional[str] = Query(None, description="Optional name search (case-insensitive substring)"),
 ):
-    stmt = select(Category)
-
-    if current_user.id is None:
-        # Only global categories
-        stmt = stmt.where(Category.user_id.is_(None))
-    else:
-        # User's categories + optionally global
-        if include_global:
-            stmt = stmt.where((Category.user_id == current_user.id) | (Category.user_id.is_(None)))
-        else:
-            stmt = stmt.where(Category.user_id == current_user.id)
+    cats = category_registry.listing(session, current_user.id, include_global=include_global)
 
     if q:
-        # SQLite: LIKE is case-insensitive by default for ASCII
-        like = f"%{q}%"
-        stmt = stmt.where(Category.name.like(like))
+        # case-insensitive substring, like SQLite's LIKE for ASCII
+        needle = q.lower()
+        cats = [c for c in cats if needle in c.name.lower()]
 
-    stmt = stmt.order_by(Category.name.asc(), Category.id.asc())
-    rows = session.exec(stmt).all()
-
-    return [CategoryOut(id=c.id, name=c.name, user_id=c.user_id) for c in rows]
+    return [CategoryOut(id=c.id, name=c.name, user_id=c.user_id) for c in cats]
 
 
 # ---------- POST: create a category (user-scoped) ----------
@@ -71,6 +61,8 @@ def create_category(payload: CategoryCreateIn, session: Session = Depends(get_se
 
     cat = Category(user_id=payload.user_id, name=payload.name)
     session.add(cat)
+    data_version.bump(session, payload.user_id)
     session.commit()
     session.refresh(cat)
+    category_registry.invalidate_user(cat.user_id)
     return CategoryOut(id=cat.id, name=cat.name, user_id=cat.user_id)
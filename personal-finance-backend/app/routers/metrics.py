@@ -0,0 +1,41 @@
+import ipaddress
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from ..config import METRICS_ALLOW_IPS, METRICS_TOKEN
+from ..core.metrics import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_ALLOWED_NETWORKS = [ipaddress.ip_network(ip, strict=False) for ip in METRICS_ALLOW_IPS]
+
+
+def _client_allowed(host: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(addr in net for net in _ALLOWED_NETWORKS)
+
+def require_metrics_access(request: Request) -> None:
+    """
+    Cache, pool and per-route latency series are internal: allow the
+    METRICS_TOKEN bearer token or a client in METRICS_ALLOW_IPS, nobody else.
+    """
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return
+    if request.client is not None and _client_allowed(request.client.host):
+        return
+    raise HTTPException(status_code=403, detail="Not allowed to read metrics")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_access)])
+def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus text exposition: HTTP, SQL and receipt stage histograms plus cache/pool stats."""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
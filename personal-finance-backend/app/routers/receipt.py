@@ -1,12 +1,27 @@
 from __future__ import annotations
-import io, re
-from typing import Dict, Any, List, Optional
+import time, threading
+import asyncio, json
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Callable
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from pdf2image import convert_from_bytes
-from PIL import Image
-import torch
-
-from ..donut_runtime import get_donut
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..config import (
+    DONUT_MODEL_ID, DONUT_RUNTIME, PDF_RASTER_DPI, OCR_MAX_PAGES, PDF_TEXT_MIN_CHARS, OCR_TIMEOUT_MS,
+    DONUT_IMAGE_SIZE, RECEIPT_AUTOCROP, OCR_BATCH_MAX,
+)
+from ..core import metrics
+from ..inference import inference_pool, InferenceBusy
+from ..receipt_cache import receipt_cache, cache_key
+from ..receipt_jobs import receipt_jobs, ReceiptJob, JobStoreFull
+from ..receipt_parser import PARSER_VERSION, parse_cord_items, parse_text_items
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# PIL (image_prep), pdfplumber and pdf2image are imported on first use (or by warm_up), and
+# torch/transformers only inside the inference workers: importing this router
+# costs the API nothing when receipts are never extracted.
 
 router = APIRouter(prefix="/extract", tags=["receipt"])
 
@@ -18,169 +33,188 @@ def _kind(file: UploadFile) -> str:
         return "pdf"
     return "image"
 
-def _pil_from_bytes(raw: bytes) -> Image.Image:
-    return Image.open(io.BytesIO(raw)).convert("RGB")
-
-# ---------- Donut (minimal) ----------
-
-def _run_donut_raw_json(img: Image.Image) -> str:
-    processor, model, device = get_donut()
-
-    task_prompt = "<s_cord-v2>"                       # REQUIRED for CORD model
-    decoder_input_ids = processor.tokenizer(
-        task_prompt, add_special_tokens=False, return_tensors="pt"
-    ).input_ids.to(device)
-
-    pixel_values = processor(images=img, return_tensors="pt").pixel_values.to(device)
-
-    with torch.no_grad():
-        output_ids = model.generate(
-            pixel_values=pixel_values,
-            decoder_input_ids=decoder_input_ids,
-            max_length=512,
-            num_beams=1,
-            early_stopping=True,
+def _prepare_image(raw: bytes) -> Image.Image:
+    """Upload -> Donut-sized image (see app/image_prep.py)."""
+    from ..image_prep import BadImage, prepare_image
+    try:
+        return prepare_image(raw)
+    except BadImage:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+
+# Stage callback: progress("decoding", page=2). Used by the jobs API for SSE.
+Progress = Callable[..., None]
+
+def _no_progress(stage: str, **data: Any) -> None:
+    pass
+
+# ---------- Donut (via inference pool) ----------
+
+async def _run_donut_raw_json(img: Image.Image) -> str:
+    try:
+        return await inference_pool.submit(img)
+    except InferenceBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Receipt extraction is busy, please retry shortly.",
+            headers={"Retry-After": "5"},
         )
 
-    raw = processor.batch_decode(output_ids, skip_special_tokens=True)[0]
-    # Keep only the JSON-like or tag string if surrounded by extra text
-    m = re.search(r"\{.*\}", raw, flags=re.S)
-    return m.group(0) if m else raw
-
-# ---------- CORD markup parser ----------
+async def _run_donut_pdf(raw: bytes, progress: Progress) -> tuple[str, int]:
+    """
+    Feed rendered pages into Donut as they arrive; pages are joined as CORD
+    blocks in page order. Up to OCR_BATCH_MAX pages (at most OCR_QUEUE_MAX)
+    are in flight at once, so a multi-page PDF fills a micro-batch instead of
+    paying a round-trip per page, while rendering waits rather than piling up
+    images.
+    """
+    from pdf2image.exceptions import (
+        PDFPageCountError, PDFPopplerTimeoutError, PDFSyntaxError, PopplerNotInstalledError,
+    )
+    from ..pdf_ingest import iter_pdf_pages
 
-TAG_RE = re.compile(r"</?[^>]+>")  # to strip tags when needed
+    # one PDF never takes more of the inference queue than a batch
+    in_flight = asyncio.Semaphore(max(1, min(OCR_BATCH_MAX, inference_pool.queue_max)))
 
-def _dec_to_float(s: str) -> Optional[float]:
-    """Handle both 235.10 and 235,10; tolerate group separators."""
-    s = s.strip()
-    if not s:
-        return None
-    # decimal comma -> dot (but first remove group separators like '.' or spaces)
-    if re.search(r"\d+,\d{2}\b", s):
-        tmp = re.sub(r"(?<=\d)[.\s](?=\d{3}\b)", "", s)
-        tmp = tmp.replace(",", ".")
-        m = re.search(r"\d+(?:\.\d{1,2})?", tmp)
-        return float(m.group(0)) if m else None
-    # decimal point path (remove comma/space grouping)
-    tmp = re.sub(r"(?<=\d)[,\s](?=\d{3}\b)", "", s)
-    m = re.search(r"\d+(?:\.\d{1,2})?", tmp)
-    return float(m.group(0)) if m else None
-
-def _split_blocks(raw: str) -> List[str]:
-    """Split CORD-style output by <sep/> markers."""
-    return [b for b in raw.split("<sep/>") if b.strip()]
-
-def _find_all(tag: str, block: str) -> List[str]:
-    """Extract inner texts of repeated tags like <s_nm>...</s_nm> in a block."""
-    out = []
-    for m in re.finditer(fr"<{tag}>(.*?)</{tag}>", block, flags=re.S):
-        out.append(m.group(1).strip())
-    return out
-
-def _looks_like_total_or_meta(text: str) -> bool:
-    t = text.lower()
-    return any(kw in t for kw in [
-        "sum", "total", "varer", "bank", "mva", "vat", "tax", "kontant", "kort",
-        "authorized", "autoriser", "kasse", "kvitt", "resultat", "kopi", "psn",
-        "ref", "arc", "aid", "tid", "terminal", "terminal", "operator", "time",
-        "takk", "thanks", "receipt", "invoice"
-    ])
-
-DATE_PATTERNS = [
-    r"\b(\d{4})-(\d{2})-(\d{2})\b",      # 2023-10-02
-    r"\b(\d{2})[.\-\/](\d{2})[.\-\/](\d{2,4})\b",  # 02.10.23 or 02-10-2023
-]
-
-def _extract_date_from_raw(raw: str) -> Optional[str]:
-    # Prefer ISO yyyy-mm-dd first
-    m = re.search(DATE_PATTERNS[0], raw)
-    if m:
-        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
-    m = re.search(DATE_PATTERNS[1], raw)
-    if m:
-        d1, d2, d3 = m.groups()
-        if len(d3) == 2:  # yy -> 20yy
-            d3 = "20" + d3
+    async def _decode(img: Image.Image, page_no: int) -> str:
         try:
-            return f"{int(d3):04d}-{int(d2):02d}-{int(d1):02d}"
-        except Exception:
-            return None
-    return None
-
-def parse_cord_items(raw: str) -> Dict[str, Any]:
-    """
-    Returns:
-      { items: [{name, price}], total: float|None, date: 'YYYY-MM-DD'|None }
-    """
-    blocks = _split_blocks(raw)
-    items: List[Dict[str, Any]] = []
-    total: Optional[float] = None
-
-    for b in blocks:
-        names = _find_all("s_nm", b)
-        unitprices = _find_all("s_unitprice", b)
-        prices = _find_all("s_price", b)
-
-        # Prefer explicit <s_price>, else unitprice
-        nums = [x for x in (prices + unitprices) if x]
-        last_num = nums[-1] if nums else None
-        price_val = _dec_to_float(last_num) if last_num else None
-
-        # Pick a plausible name: last <s_nm> that isn't meta-ish
-        name = None
-        for cand in reversed(names):
-            # skip obvious numeric-only or meta-ish lines
-            if _looks_like_total_or_meta(cand):
-                continue
-            if re.fullmatch(r"[0-9\s\-\.:]+", cand):
-                continue
-            # clean nested tags if any
-            name = TAG_RE.sub("", cand).strip()
-            if name:
+            progress("decoding", page=page_no)
+            return await _run_donut_raw_json(img)
+        finally:
+            in_flight.release()
+
+    stop = threading.Event()
+    pages = iter_pdf_pages(raw, stop=stop)
+    tasks: List[asyncio.Task] = []
+    try:
+        while not any(t.done() and not t.cancelled() and t.exception() for t in tasks):
+            try:
+                with metrics.stage("rasterize"):
+                    img = await run_in_threadpool(next, pages, None)
+            except (PopplerNotInstalledError, FileNotFoundError):
+                # pdfinfo/pdftoppm missing on this host: not the upload's fault
+                raise HTTPException(status_code=503, detail="PDF rasterizer unavailable")
+            except (PDFPageCountError, PDFSyntaxError, PDFPopplerTimeoutError):
+                raise HTTPException(status_code=400, detail="Could not rasterize PDF")
+            if img is None:
                 break
+            progress("rasterized", page=len(tasks) + 1)
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(_decode(img, len(tasks) + 1)))
+            del img  # the task holds it until decoded
+        outputs: List[str] = await asyncio.gather(*tasks)  # a failed page (e.g. 503 busy) raises here
+    finally:
+        # deadline (cancelled) or error: the render loop starts no further page, queued pages are dropped
+        stop.set()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await run_in_threadpool(pages.close)
+        except ValueError:
+            pass  # cancelled mid-page: `next` is still running in the threadpool and returns on `stop`
+
+    if not outputs:
+        raise HTTPException(status_code=400, detail="Could not rasterize PDF")
+    return "<sep/>".join(outputs), len(outputs)
+
+# ---------- PDF text layer ----------
+
+def _try_pdf_text(raw: bytes, stop: threading.Event) -> Optional[Dict[str, Any]]:
+    """Parsed result from the text layer, or None when Donut is needed."""
+    from ..pdf_ingest import extract_pdf_text
+    try:
+        text = extract_pdf_text(raw, stop=stop)
+    except Exception:
+        # malformed for pdfplumber; pdftoppm may still cope
+        return None
+    if len("".join(text.split())) < PDF_TEXT_MIN_CHARS:
+        return None
+    parsed = parse_text_items(text)
+    if not parsed["items"] and parsed["total"] is None:
+        return None
+    return {"text": text, "parsed": parsed}
 
-        # Identify totals explicitly
-        if any(_looks_like_total_or_meta(n) and "total" in n.lower() for n in names) and price_val:
-            # capture overall total (doesn't go into items)
-            if (total is None) or (price_val > total):
-                total = price_val
-            continue
+# ---------- warm-up (OCR_WARMUP=1) ----------
 
-        # Add item when we have both
-        if name and price_val is not None:
-            items.append({"name": name, "price": price_val})
+_warmup_task: Optional[asyncio.Task] = None
 
-    date = _extract_date_from_raw(raw)
-    return {"items": items, "total": total, "date": date}
+def _import_ocr_stack() -> None:
+    from .. import image_prep  # noqa: F401  (PIL)
+    from .. import pdf_ingest  # noqa: F401  (pdfplumber, pdf2image)
 
-# ---------- API ----------
+async def _warm_up() -> None:
+    await run_in_threadpool(_import_ocr_stack)
+    await inference_pool.warm_up()
 
-@router.post("/receipt")
-async def extract_receipt_raw(file: UploadFile = File(...)) -> Dict[str, Any]:
-    """
-    Minimal Donut call + CORD markup parsing to item transactions.
-    """
-    raw = await file.read()
-    if not raw:
-        raise HTTPException(status_code=400, detail="Empty upload")
+def start_warmup() -> None:
+    """Import the OCR stack and load Donut in the background; GET /ready reports progress."""
+    global _warmup_task
+    if _warmup_task is None:
+        inference_pool.state = "warming"  # before the task first runs, so /ready never sees "cold"
+        _warmup_task = asyncio.create_task(_warm_up())
 
-    # rasterize first page for PDFs; else load image
-    if _kind(file) == "pdf":
-        pages = convert_from_bytes(raw, fmt="png")
-        if not pages:
-            raise HTTPException(status_code=400, detail="Could not rasterize PDF")
-        img = pages[0]
-        source = "donut-pdf"
-    else:
-        img = _pil_from_bytes(raw)
-        source = "donut-image"
+def stop_warmup() -> None:
+    global _warmup_task
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        _warmup_task = None
 
-    # Donut -> CORD markup (string)
-    cord_str = _run_donut_raw_json(img)
+# ---------- API ----------
+
+async def _extract(raw: bytes, is_pdf: bool, progress: Progress = _no_progress) -> Dict[str, Any]:
+    """Upload bytes -> response payload (cache, text layer or Donut, then parse)."""
+    from ..image_prep import PREP_VERSION
+
+    # preprocessing changes what Donut sees, so its settings are part of the key too
+    prep = f"prep={PREP_VERSION}:{DONUT_IMAGE_SIZE[0]}x{DONUT_IMAGE_SIZE[1]}:crop={int(RECEIPT_AUTOCROP)}"
+    variant = f"pdf:dpi={PDF_RASTER_DPI}:pages={OCR_MAX_PAGES}:{prep}" if is_pdf else f"image:{prep}"
+
+    # Same bytes + same model (and runtime: int8 may decode differently) + same parser => same answer
+    key = cache_key(raw, f"{DONUT_MODEL_ID}:{DONUT_RUNTIME}", PARSER_VERSION, variant)
+    with metrics.stage("cache"):
+        cached, cache_tier = await run_in_threadpool(receipt_cache.get, key)
+    if cached is not None:
+        cord_str, parsed, source = cached["raw_json"], cached["parsed"], cached["source"]
+        pages = cached.get("pages", 1)
+        elapsed_ms = cached.get("elapsed_ms")  # cost of the original extraction
+    else:
+        started = time.perf_counter()
+        text_hit = None
+        if is_pdf:
+            stop = threading.Event()
+            try:
+                with metrics.stage("pdf_text"):
+                    text_hit = await run_in_threadpool(_try_pdf_text, raw, stop)
+            finally:
+                stop.set()  # deadline: stop reading pages in the abandoned thread
+        if text_hit is not None:
+            # digital PDF: no rasterize, no Donut
+            cord_str, parsed, pages = text_hit["text"], text_hit["parsed"], 1
+            source = "pdf-text"
+        elif is_pdf:
+            # every page up to OCR_MAX_PAGES, rendered at PDF_RASTER_DPI
+            cord_str, pages = await _run_donut_pdf(raw, progress)
+            with metrics.stage("parse"):
+                parsed = parse_cord_items(cord_str)
+            source = "donut-pdf"
+        else:
+            with metrics.stage("prepare"):
+                img = await run_in_threadpool(_prepare_image, raw)
+            progress("rasterized", page=1)
+            progress("decoding", page=1)
+            cord_str, pages = await _run_donut_raw_json(img), 1
+            with metrics.stage("parse"):
+                parsed = parse_cord_items(cord_str)
+            source = "donut-image"
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        await run_in_threadpool(
+            receipt_cache.put, key,
+            {"raw_json": cord_str, "parsed": parsed, "source": source, "pages": pages,
+             "elapsed_ms": elapsed_ms},
+        )
 
-    # Parse items from CORD markup
-    parsed = parse_cord_items(cord_str)
+    progress("parsed", items=len(parsed["items"]))
     date = parsed["date"]
 
     # Map to your draft transactions (one per item)
@@ -199,9 +233,121 @@ async def extract_receipt_raw(file: UploadFile = File(...)) -> Dict[str, Any]:
         "transactions": transactions,
         "raw_json": cord_str,     # keep for debugging/QA in frontend
         "diagnostics": {
-            "source": source,
+            "source": source,              # pdf-text | donut-pdf | donut-image
+            "elapsed_ms": elapsed_ms,
+            "pages": pages,
             "date_detected": date is not None,
             "items": len(parsed["items"]),
             "total": parsed["total"],
+            "cache": cache_tier,
         },
     }
+
+async def _extract_with_deadline(raw: bytes, is_pdf: bool, progress: Progress = _no_progress) -> Dict[str, Any]:
+    """
+    Jobs only: fail after OCR_TIMEOUT_MS. Cancelling stops the pipeline
+    between steps: no further PDF page is read or rendered and queued Donut
+    requests are dropped. A step already running in a thread or worker (one
+    page render, one image preprocess, one generate batch) still finishes in
+    the background.
+
+    POST /extract/receipt has no deadline: its first call may include
+    starting a worker and loading the model, and a 504 there would not stop
+    the inference anyway.
+    """
+    try:
+        return await asyncio.wait_for(_extract(raw, is_pdf, progress), OCR_TIMEOUT_MS / 1000)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Receipt extraction exceeded {OCR_TIMEOUT_MS} ms")
+
+@router.post("/receipt")
+async def extract_receipt_raw(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """
+    Minimal Donut call + CORD markup parsing to item transactions.
+    """
+    with metrics.stage("upload_read"):
+        raw = await file.read()
+    if not raw:
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    return await _extract(raw, _kind(file) == "pdf")
+
+# ---------- Jobs API (async variant) ----------
+
+# keep task references so running jobs are not garbage collected
+_job_tasks: set = set()
+
+async def _run_job(job: ReceiptJob, raw: bytes, is_pdf: bool) -> None:
+    metrics.detach_request()  # the POST that started us has already answered
+    job.status = "running"
+    try:
+        result = await _extract_with_deadline(raw, is_pdf, job.emit)
+    except HTTPException as he:
+        job.fail(he.status_code, he.detail)
+    except Exception as e:
+        job.fail(500, f"Extraction failed: {e}")
+    else:
+        job.succeed(result)
+
+def _get_job(job_id: str) -> ReceiptJob:
+    job = receipt_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.post("/receipt/jobs", status_code=202)
+async def create_receipt_job(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """
+    Starts extraction in the background and returns immediately.
+    Poll GET /extract/receipt/jobs/{id} or stream GET /extract/receipt/jobs/{id}/events.
+    """
+    with metrics.stage("upload_read"):
+        raw = await file.read()
+    if not raw:
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    try:
+        job = receipt_jobs.create()
+    except JobStoreFull:
+        raise HTTPException(status_code=503, detail="Too many receipt jobs in progress", headers={"Retry-After": "5"})
+
+    job.emit("queued")
+    task = asyncio.create_task(_run_job(job, raw, _kind(file) == "pdf"))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/extract/receipt/jobs/{job.id}",
+        "events_url": f"/extract/receipt/jobs/{job.id}/events",
+    }
+
+@router.get("/receipt/jobs/{job_id}")
+def get_receipt_job(job_id: str) -> Dict[str, Any]:
+    """Job status; `result` is the same payload POST /extract/receipt returns."""
+    return _get_job(job_id).public()
+
+@router.get("/receipt/jobs/{job_id}/events")
+async def receipt_job_events(job_id: str) -> StreamingResponse:
+    """Server-sent events: one `stage` event per stage, then `end` with the final status."""
+    job = _get_job(job_id)
+
+    async def stream():
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                yield f"event: stage\ndata: {json.dumps(job.events[sent])}\n\n"
+                sent += 1
+            if job.finished:
+                yield f"event: end\ndata: {json.dumps(job.public())}\n\n"
+                return
+            await job.wait_change(timeout=15)
+            if sent == len(job.events) and not job.finished:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,17 @@
-from datetime import date as Date
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, Query
+import calendar
+from collections import defaultdict
+from datetime import date as Date, timedelta
+from typing import List, Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlmodel import Session, select
 from sqlalchemy import func
 
+from ..data_version import versioned_response
 from ..db import get_session
-from ..models import Transaction, Category, TxnType, User
+from ..models import Transaction, TxnType, MonthlyRollup
+from ..rollup import year_month
+from ..category_registry import category_registry
+from ..core.principal_cache import Principal
 from ..routers.auth import get_current_user
 
 
@@ -17,15 +23,44 @@ def _minor_to_rupees(n: int) -> float:
     # return as numeric rupees (two decimals)
     return round(n / 100.0, 2)
 
+def _month_end(d: Date) -> Date:
+    return d.replace(day=calendar.monthrange(d.year, d.month)[1])
+
+def _split_range(
+    from_: Optional[Date], to: Optional[Date]
+) -> Tuple[Optional[Tuple[Optional[str], Optional[str]]], List[Tuple[Optional[Date], Optional[Date]]]]:
+    """
+    Split [from_, to] into whole months (served from monthly_rollups) and the
+    partial months at either edge (summed from raw transactions).
+    Returns ((first_ym, last_ym) or None, [(raw_from, raw_to), ...]); None bounds are open.
+    """
+    first_ym = None
+    if from_:
+        first_ym = year_month(from_ if from_.day == 1 else _month_end(from_) + timedelta(days=1))
+    last_ym = None
+    if to:
+        last_ym = year_month(to if to == _month_end(to) else to.replace(day=1) - timedelta(days=1))
+
+    if first_ym and last_ym and first_ym > last_ym:
+        return None, [(from_, to)]  # no whole month inside the range
+
+    edges: List[Tuple[Optional[Date], Optional[Date]]] = []
+    if from_ and from_.day != 1:
+        edges.append((from_, _month_end(from_)))
+    if to and to != _month_end(to):
+        edges.append((to.replace(day=1), to))
+    return (first_ym, last_ym), edges
+
 
 # -------- 1) Category-wise (date range) --------
 # GET /summary/category?user_id=1&from=2025-08-01&to=2025-08-31
 @router.get("/category")
 def summary_by_category(
+    request: Request,
     session: Session = Depends(get_session),
     from_: Optional[Date] = Query(None, alias="from"),  # YYYY-MM-DD
     to: Optional[Date] = Query(None),                   # YYYY-MM-DD
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Dict[str, Any]:
     """
     Returns:
@@ -34,28 +69,57 @@ def summary_by_category(
       "values": [1234.5, 890.0, 0.0, ...],  // rupees
       "total": 2124.5                        // rupees
     }
+    ETag / If-None-Match aware (see app/data_version.py).
     """
-    # user-scoped + expense only
-    where = [Transaction.user_id == current_user.id, Transaction.type == TxnType.expense]
-    if from_:
-        where.append(Transaction.date >= from_)
-    if to:
-        where.append(Transaction.date <= to)
+    return versioned_response(
+        request, session, current_user.id,
+        lambda: _summary_by_category(session, current_user, from_, to),
+    )
+
+def _summary_by_category(
+    session: Session, current_user: Principal, from_: Optional[Date], to: Optional[Date]
+) -> Dict[str, Any]:
+    # user-scoped + expense only; whole months from the rollup, partial months from raw rows
+    months, edges = _split_range(from_, to)
+    sums_by_cat: Dict[Optional[int], int] = defaultdict(int)
 
-    category_name = func.coalesce(Category.name, "Uncategorized")
+    if months is not None:
+        first_ym, last_ym = months
+        where = [MonthlyRollup.user_id == current_user.id, MonthlyRollup.type == TxnType.expense]
+        if first_ym:
+            where.append(MonthlyRollup.year_month >= first_ym)
+        if last_ym:
+            where.append(MonthlyRollup.year_month <= last_ym)
+        stmt = (
+            select(MonthlyRollup.category_id, func.sum(MonthlyRollup.sum_minor))
+            .where(*where)
+            .group_by(MonthlyRollup.category_id)
+        )
+        for cat_id, sum_minor in session.exec(stmt):
+            sums_by_cat[cat_id] += int(sum_minor or 0)
 
-    stmt = (
-        select(
-            category_name.label("cat"),
-            func.sum(Transaction.amount_minor).label("sum_minor"),
+    for edge_from, edge_to in edges:
+        stmt = (
+            select(Transaction.category_id, func.sum(Transaction.amount_minor))
+            .where(
+                Transaction.user_id == current_user.id,
+                Transaction.type == TxnType.expense,
+                Transaction.date >= edge_from,
+                Transaction.date <= edge_to,
+            )
+            .group_by(Transaction.category_id)
         )
-        .where(*where)
-        .join(Category, Category.id == Transaction.category_id, isouter=True)
-        .group_by(category_name)
-        .order_by(func.sum(Transaction.amount_minor).desc())
-    )
+        for cat_id, sum_minor in session.exec(stmt):
+            sums_by_cat[cat_id] += int(sum_minor or 0)
 
-    rows = session.exec(stmt).all()
+    # name per category (missing/NULL => "Uncategorized"); same-named categories merge, as before
+    ids = [cid for cid in sums_by_cat if cid is not None]
+    names = {cid: c.name for cid, c in category_registry.resolve(session, current_user.id, ids).items()}
+    sums_by_name: Dict[str, int] = defaultdict(int)
+    for cat_id, sum_minor in sums_by_cat.items():
+        sums_by_name[names.get(cat_id, "Uncategorized")] += sum_minor
+
+    rows = sorted(sums_by_name.items(), key=lambda kv: kv[1], reverse=True)
 
     labels: List[str] = []
     values: List[float] = []
@@ -78,9 +142,10 @@ def summary_by_category(
 # GET /summary/monthly?user_id=1&year=2025
 @router.get("/monthly")
 def summary_monthly(
+    request: Request,
     session: Session = Depends(get_session),
     year: int = Query(..., description="Year, e.g., 2025"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Dict[str, Any]:
     """
     Returns:
@@ -89,30 +154,31 @@ def summary_monthly(
       "labels": ["Jan","Feb",...,"Dec"],
       "values": [100.0, 0.0, 250.5, ...]  // rupees per month, expenses only
     }
+    ETag / If-None-Match aware (see app/data_version.py).
     """
-    month_expr = func.strftime("%m", Transaction.date)
-
-    where = [
-        Transaction.user_id == current_user.id,
-        Transaction.type == TxnType.expense,
-        func.strftime("%Y", Transaction.date) == str(year),
-    ]
+    return versioned_response(
+        request, session, current_user.id,
+        lambda: _summary_monthly(session, current_user, year),
+    )
 
+def _summary_monthly(session: Session, current_user: Principal, year: int) -> Dict[str, Any]:
     stmt = (
-        select(
-            month_expr.label("m"),
-            func.sum(Transaction.amount_minor).label("sum_minor"),
+        select(MonthlyRollup.year_month, func.sum(MonthlyRollup.sum_minor))
+        .where(
+            MonthlyRollup.user_id == current_user.id,
+            MonthlyRollup.type == TxnType.expense,
+            MonthlyRollup.year_month >= f"{year:04d}-01",
+            MonthlyRollup.year_month <= f"{year:04d}-12",
         )
-        .where(*where)
-        .group_by(month_expr)
+        .group_by(MonthlyRollup.year_month)
     )
 
     rows = session.exec(stmt).all()
 
     # Initialize 12 months = 0
     totals_minor = [0] * 12
-    for m_str, sum_minor in rows:
-        idx = int(m_str) - 1  # '01' -> 0
+    for ym, sum_minor in rows:
+        idx = int(ym[5:7]) - 1  # '2025-01' -> 0
         totals_minor[idx] = int(sum_minor or 0)
 
     labels = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
@@ -123,3 +189,125 @@ def summary_monthly(
         "labels": labels,
         "values": values,
     }
+
+
+# -------- 3) Time series (any range, any bucket) --------
+# GET /summary/timeseries?from=2023-01-01&to=2025-12-31&bucket=quarter
+
+BUCKETS = ("day", "week", "month", "quarter", "year")
+MAX_BUCKETS = 1000
+
+def _add_months(d: Date, n: int) -> Date:
+    m = d.month - 1 + n
+    return d.replace(year=d.year + m // 12, month=m % 12 + 1, day=1)
+
+def _bucket_start(d: Date, bucket: str) -> Date:
+    if bucket == "day":
+        return d
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())  # ISO week, Monday
+    if bucket == "month":
+        return d.replace(day=1)
+    if bucket == "quarter":
+        return d.replace(month=(d.month - 1) // 3 * 3 + 1, day=1)
+    return d.replace(month=1, day=1)
+
+def _next_bucket(start: Date, bucket: str) -> Date:
+    if bucket == "day":
+        return start + timedelta(days=1)
+    if bucket == "week":
+        return start + timedelta(days=7)
+    return _add_months(start, {"month": 1, "quarter": 3, "year": 12}[bucket])
+
+def _bucket_label(start: Date, bucket: str) -> str:
+    if bucket == "week":
+        iso_year, iso_week, _ = start.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}"
+    if bucket == "month":
+        return f"{start.year}-{start.month:02d}"
+    if bucket == "quarter":
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    if bucket == "year":
+        return str(start.year)
+    return start.isoformat()
+
+@router.get("/timeseries")
+def summary_timeseries(
+    request: Request,
+    session: Session = Depends(get_session),
+    from_: Date = Query(..., alias="from"),  # YYYY-MM-DD
+    to: Date = Query(...),                   # YYYY-MM-DD
+    bucket: str = Query("month", description="day | week | month | quarter | year"),
+    current_user: Principal = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """
+    Returns (zero-filled, one entry per bucket from `from` to `to`):
+    {
+      "bucket": "month",
+      "labels": ["2025-01", ...],          // 2025-01-06 | 2025-W02 | 2025-01 | 2025-Q1 | 2025
+      "starts": ["2025-01-01", ...],       // first day of each bucket
+      "income": [...], "expense": [...], "net": [...],   // rupees
+      "totals": {"income": .., "expense": .., "net": ..}
+    }
+    ETag / If-None-Match aware (see app/data_version.py).
+    """
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}.")
+    if from_ > to:
+        raise HTTPException(status_code=400, detail="'from' must be on or before 'to'.")
+
+    starts: List[Date] = []
+    cur = _bucket_start(from_, bucket)
+    while cur <= to:
+        starts.append(cur)
+        if len(starts) > MAX_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_BUCKETS} buckets; use a larger bucket.")
+        cur = _next_bucket(cur, bucket)
+    return versioned_response(
+        request, session, current_user.id,
+        lambda: _summary_timeseries(session, current_user, from_, to, bucket, starts),
+    )
+
+def _summary_timeseries(
+    session: Session, current_user: Principal, from_: Date, to: Date, bucket: str, starts: List[Date]
+) -> Dict[str, Any]:
+    index = {s: i for i, s in enumerate(starts)}
+
+    # Plain range predicates on date (no strftime), so the (user_id, type, date, ...) index covers it
+    stmt = (
+        select(Transaction.date, Transaction.type, func.sum(Transaction.amount_minor))
+        .where(
+            Transaction.user_id == current_user.id,
+            Transaction.type.in_([TxnType.expense, TxnType.income]),
+            Transaction.date >= from_,
+            Transaction.date <= to,
+        )
+        .group_by(Transaction.date, Transaction.type)
+    )
+
+    income_minor = [0] * len(starts)
+    expense_minor = [0] * len(starts)
+    for d, txn_type, sum_minor in session.exec(stmt):
+        i = index[_bucket_start(d, bucket)]
+        if txn_type == TxnType.income:
+            income_minor[i] += int(sum_minor or 0)
+        else:
+            expense_minor[i] += int(sum_minor or 0)
+
+    net_minor = [inc - exp for inc, exp in zip(income_minor, expense_minor)]
+
+    return {
+        "bucket": bucket,
+        "from": from_,
+        "to": to,
+        "labels": [_bucket_label(s, bucket) for s in starts],
+        "starts": starts,
+        "income": [_minor_to_rupees(n) for n in income_minor],
+        "expense": [_minor_to_rupees(n) for n in expense_minor],
+        "net": [_minor_to_rupees(n) for n in net_minor],
+        "totals": {
+            "income": _minor_to_rupees(sum(income_minor)),
+            "expense": _minor_to_rupees(sum(expense_minor)),
+            "net": _minor_to_rupees(sum(net_minor)),
+        },
+    }
@@ -1,15 +1,28 @@
 # app/routers/transactions.py
+import base64
+import json
+import tempfile
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
-from typing import Optional, List, Dict, Any
+from typing import AsyncIterator, Optional, List, Dict, Any, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlmodel import Session, select, SQLModel, Field
-from sqlalchemy import func
-
-from ..db import get_session
-from ..models import Transaction, TransactionRead, Category, TxnType, User
+from sqlalchemy import func, insert, tuple_
+
+from .. import data_version, rollup
+from ..category_registry import CategoryInfo, category_registry
+from ..config import BULK_INSERT_CHUNK, EXPORT_BATCH_ROWS
+from ..data_version import versioned_response
+from ..db import engine, get_session, write_engine
+from ..models import Transaction, TransactionRead, Category, TxnType
 from ..schemas import TransactionBulkItem, TransactionUpdate
+from ..export import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, encode_export, parquet_available
+from ..statement_import import IMPORT_FORMATS, ImportFormatError, format_from_content_type, iter_records
+from ..core.principal_cache import Principal
 from ..routers.auth import get_current_user
 
 
@@ -42,8 +55,21 @@ def _rupees_to_minor(rupees_str: str) -> int:
 def _minor_to_rupees_str(minor: int) -> str:
     return f"{Decimal(minor) / Decimal(100):.2f}"
 
+# Keyset cursor: opaque token for the (date, id) of the last row already returned.
+def _encode_cursor(d: date, tx_id: int) -> str:
+    raw = json.dumps([d.isoformat(), tx_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        d, tx_id = json.loads(raw)
+        return date.fromisoformat(d), int(tx_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid 'cursor'.")
+
 @router.post("", response_model=TransactionRead, status_code=201)
-def create_transaction(payload: TransactionCreateIn, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+def create_transaction(payload: TransactionCreateIn, session: Session = Depends(get_session), current_user: Principal = Depends(get_current_user)):
     # --- amount validation ---
     if payload.amount_minor is None and payload.amount is None:
         raise HTTPException(status_code=400, detail="Provide either 'amount' (rupees) or 'amount_minor' (paise).")
@@ -62,13 +88,7 @@ def create_transaction(payload: TransactionCreateIn, session: Session = Depends(
         # Expense MUST have a valid category accessible to user (or global)
         if payload.category_id is None:
             raise HTTPException(status_code=400, detail="category_id is required for expense.")
-        cat = session.exec(
-            select(Category).where(
-                Category.id == payload.category_id,
-                (Category.user_id == current_user.id) | (Category.user_id.is_(None)),
-            )
-        ).first()
-        if not cat:
+        if not category_registry.get(session, current_user.id, payload.category_id):
             raise HTTPException(status_code=404, detail="Category not found for this user.")
         category_id = payload.category_id
     else:
@@ -87,23 +107,22 @@ def create_transaction(payload: TransactionCreateIn, session: Session = Depends(
     )
 
     session.add(tx)
+    rollup.record_insert(session, [tx])
+    data_version.bump(session, current_user.id)
     session.commit()
     session.refresh(tx)
     return tx
 
 
-@router.get("", response_model=dict)
-def list_transactions(
-    session: Session = Depends(get_session),
-    page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=100),
-    from_: Optional[date] = Query(None, alias="from"),
-    to: Optional[date] = None,
-    type: Optional[TxnType] = None,
-    category_id: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-):
-    where = [Transaction.user_id == current_user.id]
+def _list_filters(
+    user_id: int,
+    from_: Optional[date],
+    to: Optional[date],
+    type: Optional[TxnType],
+    category_id: Optional[int],
+) -> list:
+    """WHERE clauses shared by the list and export endpoints."""
+    where = [Transaction.user_id == user_id]
 
     if from_:
         where.append(Transaction.date >= from_)
@@ -113,13 +132,56 @@ def list_transactions(
         where.append(Transaction.type == type)
     if category_id:
         where.append(Transaction.category_id == category_id)
+    return where
 
-    # total count
-    total = session.exec(
-        select(func.count()).select_from(Transaction).where(*where)
-    ).first() or 0
+@router.get("", response_model=dict)
+def list_transactions(
+    request: Request,
+    session: Session = Depends(get_session),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    type: Optional[TxnType] = None,
+    category_id: Optional[int] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces 'page'"),
+    with_total: bool = Query(True, description="Set false to skip the COUNT(*) over all matching rows"),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Offset mode: ?page=N (default). Cursor mode: pass the previous response's
+    `next_cursor` as ?cursor=...; it seeks past (date, id) instead of scanning
+    OFFSET rows, so every page costs the same however deep it is.
+    `next_cursor` is null on the last page.
+    ETag / If-None-Match aware (see app/data_version.py).
+    """
+    return versioned_response(
+        request, session, current_user.id,
+        lambda: _list_page(session, current_user, page, limit, from_, to, type, category_id, cursor, with_total),
+    )
 
-    # query page
+def _list_page(
+    session: Session,
+    current_user: Principal,
+    page: int,
+    limit: int,
+    from_: Optional[date],
+    to: Optional[date],
+    type: Optional[TxnType],
+    category_id: Optional[int],
+    cursor: Optional[str],
+    with_total: bool,
+) -> Dict[str, Any]:
+    where = _list_filters(current_user.id, from_, to, type, category_id)
+
+    # total count (filters only, never the cursor)
+    total = None
+    if with_total:
+        total = session.exec(
+            select(func.count()).select_from(Transaction).where(*where)
+        ).first() or 0
+
+    # query page (+1 row to know whether there is a next one)
     stmt = (
         select(
             Transaction.id,
@@ -133,11 +195,18 @@ def list_transactions(
         .where(*where)
         .join(Category, Category.id == Transaction.category_id, isouter=True)
         .order_by(Transaction.date.desc(), Transaction.id.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
+        .limit(limit + 1)
     )
+    if cursor:
+        after_date, after_id = _decode_cursor(cursor)
+        # same order as ORDER BY date DESC, id DESC
+        stmt = stmt.where(tuple_(Transaction.date, Transaction.id) < tuple_(after_date, after_id))
+    else:
+        stmt = stmt.offset((page - 1) * limit)
 
     rows = session.exec(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     items = [
         TransactionRowOut(
@@ -152,14 +221,156 @@ def list_transactions(
         for r in rows
     ]
 
-    return {"items": items, "page": page, "limit": limit, "total": total}
+    next_cursor = _encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None
+
+    return {
+        "items": items,
+        "page": None if cursor else page,
+        "limit": limit,
+        "total": total,
+        "next_cursor": next_cursor,
+    }
+
+
+# ---------- export ----------
+
+@router.get("/export")
+def export_transactions(
+    format: str = Query("csv", description="csv | ndjson | parquet"),
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    type: Optional[TxnType] = None,
+    category_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Whole (filtered) history, oldest first, streamed as it is read: the query
+    runs with yield_per (server-side cursor where the driver has one) and each
+    batch of EXPORT_BATCH_ROWS rows is encoded and sent before the next is
+    fetched. Parquet gets one row group per batch.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="format=parquet needs `pip install pyarrow` on the server.")
+
+    stmt = (
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.type,
+            Transaction.category_id,
+            Category.name,
+            Transaction.description,
+            Transaction.amount_minor,
+        )
+        .where(*_list_filters(current_user.id, from_, to, type, category_id))
+        .join(Category, Category.id == Transaction.category_id, isouter=True)
+        .order_by(Transaction.date, Transaction.id)
+        .execution_options(yield_per=EXPORT_BATCH_ROWS)
+    )
+
+    def _batches():
+        # own session: the response body is produced after the endpoint returns
+        with Session(engine) as session:
+            for partition in session.exec(stmt).partitions():
+                yield partition
+
+    media_type, ext = EXPORT_MEDIA_TYPES[format]
+    return StreamingResponse(
+        encode_export(format, _batches()),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{ext}"'},
+    )
 
+class BulkInsertSummary(SQLModel):
+    inserted: int
+    first_id: int
+    last_id: int
+    total_minor: int  # paise, all inserted rows
 
-@router.post("/bulk", response_model=List[TransactionRead], status_code=201)
+def _validate_bulk_item(
+    it: TransactionBulkItem, accessible: Dict[int, CategoryInfo]
+) -> tuple[List[str], Optional[int]]:
+    """
+    Row rules shared by /bulk and /import. `accessible` holds the user's
+    usable categories (category_registry.resolve). Returns (errors, amount_minor).
+    """
+    row_errs: List[str] = []
+
+    # amount validation (exactly one provided)
+    if (it.amount is None and it.amount_minor is None) or (
+        it.amount is not None and it.amount_minor is not None
+    ):
+        row_errs.append("Provide either 'amount' (rupees) or 'amount_minor' (paise), but not both.")
+
+    # type/category rules
+    if it.type == TxnType.expense:
+        if it.category_id is None:
+            row_errs.append("category_id is required for expense.")
+    else:  # income
+        if it.category_id is not None:
+            row_errs.append("category_id must be null for income.")
+
+    # category existence / access (global or same user)
+    if it.category_id is not None and it.category_id not in accessible:
+        row_errs.append("Category not found or not accessible for this user.")
+
+    # compute amount_minor
+    amount_minor: int | None = None
+    if it.amount_minor is not None:
+        if it.amount_minor <= 0:
+            row_errs.append("'amount_minor' must be > 0")
+        else:
+            amount_minor = it.amount_minor
+    elif it.amount is not None:
+        try:
+            amount_minor = _rupees_to_minor(it.amount)
+        except HTTPException as he:
+            row_errs.append(str(he.detail))
+
+    if amount_minor is None:
+        row_errs.append("Resolved amount is invalid or <= 0.")
+
+    return row_errs, amount_minor
+
+def _bulk_row(user_id: int, it: TransactionBulkItem, amount_minor: int, now: datetime) -> Dict[str, Any]:
+    """Column values for one item that passed _validate_bulk_item (/bulk and /import)."""
+    return {
+        "user_id": user_id,
+        "type": it.type,
+        "date": it.date,
+        "category_id": None if it.type == TxnType.income else it.category_id,
+        "description": (it.description or "").strip() or None,
+        "amount_minor": amount_minor,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def _insert_rows(session: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Core executemany INSERT ... RETURNING id, BULK_INSERT_CHUNK rows per call.
+    Ids come back in row order; no per-row refresh. Caller commits.
+    """
+    stmt = insert(Transaction.__table__).returning(
+        Transaction.__table__.c.id, sort_by_parameter_order=True
+    )
+    ids: List[int] = []
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        chunk = rows[start:start + BULK_INSERT_CHUNK]
+        ids.extend(session.exec(stmt, params=chunk).scalars().all())
+    return ids
+
+@router.post(
+    "/bulk",
+    response_model=Union[List[TransactionRead], BulkInsertSummary],
+    status_code=201,
+)
 def create_transactions_bulk(
     items: List[TransactionBulkItem],
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
+    summary: bool = Query(False, description="Return counts/ids instead of echoing every row"),
 ):
     if not items:
         raise HTTPException(status_code=400, detail="Provide at least one transaction.")
@@ -167,89 +378,201 @@ def create_transactions_bulk(
     # Collect per-row errors first (so user sees all problems at once)
     errors: List[Dict[str, Any]] = []
 
-    # Preload categories referenced
-    cat_ids = {it.category_id for it in items if it.category_id is not None}
-    cats_by_id: Dict[int, Category] = {}
-    if cat_ids:
-        cats = session.exec(select(Category).where(Category.id.in_(cat_ids))).all()
-        cats_by_id = {c.id: c for c in cats}
+    # Categories referenced (from the registry; no query when cached)
+    accessible = category_registry.resolve(
+        session, current_user.id, {it.category_id for it in items if it.category_id is not None}
+    )
 
-    prepared: List[Transaction] = []
+    prepared: List[Dict[str, Any]] = []
     now = datetime.utcnow()
 
     for idx, it in enumerate(items):
-        row_errs: List[str] = []
-
-        # amount validation (exactly one provided)
-        if (it.amount is None and it.amount_minor is None) or (
-            it.amount is not None and it.amount_minor is not None
-        ):
-            row_errs.append("Provide either 'amount' (rupees) or 'amount_minor' (paise), but not both.")
-
-        # type/category rules
-        if it.type == TxnType.expense:
-            if it.category_id is None:
-                row_errs.append("category_id is required for expense.")
-        else:  # income
-            if it.category_id is not None:
-                row_errs.append("category_id must be null for income.")
-
-        # category existence / access (global or same user)
-        if it.category_id is not None:
-            cat = cats_by_id.get(it.category_id)
-            if not cat or not (cat.user_id is None or cat.user_id == current_user.id):
-                row_errs.append("Category not found or not accessible for this user.")
-
-        # compute amount_minor
-        amount_minor: int | None = None
-        if it.amount_minor is not None:
-            if it.amount_minor <= 0:
-                row_errs.append("'amount_minor' must be > 0")
-            else:
-                amount_minor = it.amount_minor
-        elif it.amount is not None:
-            try:
-                amount_minor = _rupees_to_minor(it.amount)
-            except HTTPException as he:
-                row_errs.append(str(he.detail))
-
-        if amount_minor is None:
-            row_errs.append("Resolved amount is invalid or <= 0.")
-
+        row_errs, amount_minor = _validate_bulk_item(it, accessible)
         if row_errs:
             errors.append({"index": idx, "errors": row_errs})
             continue
 
-        tx = Transaction(
-            user_id=current_user.id,
-            type=it.type,
-            date=it.date,
-            category_id=None if it.type == TxnType.income else it.category_id, 
-            description=(it.description or "").strip() or None,
-            amount_minor=amount_minor,                     
-            created_at=now,
-            updated_at=now,
-        )
-        prepared.append(tx)
+        prepared.append(_bulk_row(current_user.id, it, amount_minor, now))
 
     if errors:
         # If any error, fail the whole batch (atomic behavior)
         raise HTTPException(status_code=400, detail={"message": "Validation failed", "rows": errors})
 
-    # Persist in one transaction
-    session.add_all(prepared)
+    # Persist in one transaction (chunked statements, single commit)
+    ids = _insert_rows(session, prepared)
+    rollup.record_insert_rows(session, prepared)
+    data_version.bump(session, current_user.id)
     session.commit()
-    for tx in prepared:
-        session.refresh(tx)
 
-    return prepared
+    if summary:
+        return BulkInsertSummary(
+            inserted=len(ids),
+            first_id=ids[0],
+            last_id=ids[-1],
+            total_minor=sum(r["amount_minor"] for r in prepared),
+        )
+    return [TransactionRead(id=tx_id, **row) for tx_id, row in zip(ids, prepared)]
+
+# ---------- statement import ----------
+
+IMPORT_SPOOL_BYTES = 1024 * 1024  # import body / report kept in memory up to this, then a temp file
+IMPORT_READ_BYTES = 64 * 1024     # spooled body is parsed in reads of this size
+
+def _validation_messages(e: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in e.errors()
+    ]
+
+async def _spool_body(request: Request) -> tempfile.SpooledTemporaryFile:
+    """The whole request body, so no write transaction waits on a slow upload."""
+    body = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    async for chunk in request.stream():
+        body.write(chunk)
+    body.seek(0)
+    return body
+
+async def _read_spooled(body: tempfile.SpooledTemporaryFile) -> AsyncIterator[bytes]:
+    while chunk := body.read(IMPORT_READ_BYTES):
+        yield chunk
+
+def _import_chunk(
+    session: Session,
+    user_id: int,
+    batch: List[tuple[int, TransactionBulkItem]],
+    commit: bool,
+) -> tuple[List[int], int, List[Dict[str, Any]]]:
+    """Validate + insert one chunk (blocking). Returns (ids, total_minor, row errors)."""
+    accessible = category_registry.resolve(
+        session, user_id, {it.category_id for _, it in batch if it.category_id is not None}
+    )
+
+    errors: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    now = datetime.utcnow()
+    for idx, it in batch:
+        row_errs, amount_minor = _validate_bulk_item(it, accessible)
+        if row_errs:
+            errors.append({"index": idx, "errors": row_errs})
+            continue
+        rows.append(_bulk_row(user_id, it, amount_minor, now))
+
+    ids: List[int] = []
+    if rows:
+        ids = _insert_rows(session, rows)
+        rollup.record_insert_rows(session, rows)
+        data_version.bump(session, user_id)
+    if commit:
+        session.commit()  # also ends the write transaction the category lookup may have opened
+    return ids, sum(r["amount_minor"] for r in rows), errors
+
+@router.post("/import")
+async def import_transactions(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv | ndjson (default: from Content-Type)"),
+    atomic: bool = Query(False, description="All-or-nothing: roll back everything if any row fails"),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Imports a CSV (with header) or NDJSON body into transactions, using the
+    same row rules as /bulk. The body is spooled first (memory, then a temp
+    file), so a slow upload holds no SQLite write lock, even with atomic=true.
+    It is then parsed and written in chunks of BULK_INSERT_CHUNK; by default
+    each chunk commits and invalid rows are skipped.
+
+    The whole body is read before the response starts (a streaming response
+    listens for disconnects on the same receive channel and would swallow
+    body chunks), so the report is spooled and sent afterwards as NDJSON:
+      {"index": 3, "errors": [...]}                  one per rejected row
+      {"inserted": 5000, "first_id": .., "last_id": .., "total_minor": ..}  per written chunk
+      {"done": true, "inserted": N, "failed": M, "committed": bool, "error": str|null}
+    """
+    fmt = format or format_from_content_type(request.headers.get("content-type", ""))
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson.",
+        )
+
+    body = await _spool_body(request)
+    records = iter_records(_read_spooled(body), fmt)
+    try:
+        first = await records.__anext__()  # header problems are still a plain 400
+    except StopAsyncIteration:
+        body.close()
+        raise HTTPException(status_code=400, detail="Upload contains no rows.")
+    except ImportFormatError as e:
+        body.close()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user_id = current_user.id
+    report = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES, mode="w+")
+
+    async def _all_records():
+        yield first
+        async for rec in records:
+            yield rec
+
+    inserted = failed = 0
+    error: Optional[str] = None
+    batch: List[tuple[int, TransactionBulkItem]] = []
+
+    with body, Session(write_engine) as session:
+        async def _flush():
+            nonlocal inserted, failed
+            ids, total_minor, errors = await run_in_threadpool(
+                _import_chunk, session, user_id, batch, not atomic
+            )
+            batch.clear()
+            failed += len(errors)
+            inserted += len(ids)
+            for e in errors:
+                report.write(json.dumps(e) + "\n")
+            if ids:
+                report.write(json.dumps({
+                    "inserted": len(ids), "first_id": ids[0], "last_id": ids[-1], "total_minor": total_minor,
+                }) + "\n")
+
+        try:
+            async for idx, data, parse_error in _all_records():
+                if parse_error is None:
+                    try:
+                        batch.append((idx, TransactionBulkItem.model_validate(data)))
+                    except ValidationError as e:
+                        parse_error = "; ".join(_validation_messages(e))
+                if parse_error is not None:
+                    failed += 1
+                    report.write(json.dumps({"index": idx, "errors": [parse_error]}) + "\n")
+                if len(batch) >= BULK_INSERT_CHUNK:
+                    await _flush()
+            if batch:
+                await _flush()
+        except ImportFormatError as e:
+            error = str(e)
+
+        committed = not atomic or (failed == 0 and error is None)
+        if atomic:
+            await run_in_threadpool(session.commit if committed else session.rollback)
+            if not committed:
+                inserted = 0
+
+    report.write(json.dumps({
+        "done": True, "inserted": inserted, "failed": failed, "committed": committed, "error": error,
+    }) + "\n")
+    report.seek(0)
+
+    def _report_lines():
+        with report:
+            yield from report
+
+    return StreamingResponse(_report_lines(), media_type="application/x-ndjson")
 
 @router.patch("/{tx_id}", response_model=TransactionRead)
 def update_transaction(
     tx_id: int,
     payload: TransactionUpdate,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),   # ← inject user from JWT
+    current_user: Principal = Depends(get_current_user),   # ← inject user from JWT
 ):
     """
     Partial update (user-scoped):
@@ -267,6 +590,8 @@ def update_transaction(
     if tx.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed to modify this transaction")
 
+    before = rollup.snapshot(tx)
+
     # ---- Validate amount fields (exclusive) ----
     if payload.amount is not None and payload.amount_minor is not None:
         raise HTTPException(
@@ -311,19 +636,15 @@ def update_transaction(
         # expense must have a valid category (global or owned by current user)
         if desired_category_id is None:
             raise HTTPException(status_code=400, detail="category_id is required for expense transactions.")
-        cat = session.exec(
-            select(Category).where(
-                Category.id == desired_category_id,
-                (Category.user_id == current_user.id) | (Category.user_id.is_(None)),  # ← user/global
-            )
-        ).first()
-        if not cat:
+        if not category_registry.get(session, current_user.id, desired_category_id):  # ← user/global
             raise HTTPException(status_code=404, detail="Category not found or not accessible for this user.")
         tx.type = TxnType.expense
         tx.category_id = desired_category_id
 
     tx.updated_at = datetime.utcnow()
     session.add(tx)
+    rollup.record_update(session, before, tx)
+    data_version.bump(session, current_user.id)
     session.commit()
     session.refresh(tx)
     return tx
@@ -333,7 +654,7 @@ def update_transaction(
 def delete_transaction(
     tx_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),  # enforce auth
+    current_user: Principal = Depends(get_current_user),  # enforce auth
 ):
     tx = session.get(Transaction, tx_id)
     if not tx:
@@ -344,6 +665,8 @@ def delete_transaction(
         raise HTTPException(status_code=403, detail="Not allowed to delete this transaction")
 
     session.delete(tx)
+    rollup.record_delete(session, tx)
+    data_version.bump(session, current_user.id)
     session.commit()
     # 204 No Content has no body
     return None
\ No newline at end of file
@@ -1,5 +1,6 @@
 from sqlmodel import Session, select
 from .models import Category
+from .category_registry import category_registry
 
 DEFAULT_CATEGORIES = [
     "Food",
@@ -30,3 +31,4 @@ def seed_categories(session: Session) -> None:
     if new_items:
         session.add_all(new_items)
         session.commit()
+        category_registry.invalidate_user(None)  # global set changed
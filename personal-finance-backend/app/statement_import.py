@@ -0,0 +1,121 @@
+"""
+Incremental CSV / NDJSON readers for POST /transactions/import.
+
+Both read the raw request body chunk by chunk and yield one record at a time,
+so memory depends on the longest record, not on the file size.
+
+CSV needs a header row; columns are the TransactionBulkItem fields
+(type, date, category_id, description, amount, amount_minor), unknown columns
+are ignored and empty cells count as missing. NDJSON is one JSON object per line.
+"""
+from __future__ import annotations
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+IMPORT_FORMATS = ("csv", "ndjson")
+CSV_COLUMNS = ("type", "date", "category_id", "description", "amount", "amount_minor")
+CSV_REQUIRED = ("type", "date")
+MAX_RECORD_BYTES = 64 * 1024  # a single line/record; guards against a file with no newlines
+
+# (record number from 0, record or None, parse error or None)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole is unusable (bad header, oversized record, bad encoding)."""
+
+
+def format_from_content_type(content_type: str) -> Optional[str]:
+    ct = content_type.split(";", 1)[0].strip().lower()
+    if ct in ("text/csv", "application/csv"):
+        return "csv"
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    return None
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """UTF-8 lines (newline kept) from a byte stream; a BOM is dropped."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line + "\n"
+            if len(pending) > MAX_RECORD_BYTES:
+                raise ImportFormatError(f"Line longer than {MAX_RECORD_BYTES} bytes")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise ImportFormatError("Upload is not valid UTF-8") from e
+    if pending:
+        yield pending
+
+# ---------- CSV ----------
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Joins physical lines until quotes balance (quoted fields may contain newlines)."""
+    buf = ""
+    async for line in lines:
+        buf += line
+        if buf.count('"') % 2 == 0:
+            yield buf
+            buf = ""
+        elif len(buf) > MAX_RECORD_BYTES:
+            raise ImportFormatError(f"Record longer than {MAX_RECORD_BYTES} bytes (unbalanced quotes?)")
+    if buf:
+        yield buf
+
+def _parse_csv_row(text: str) -> List[str]:
+    return next(csv.reader([text]), [])
+
+async def iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    records = _csv_records(lines)
+    header: Optional[List[str]] = None
+    async for text in records:
+        if not text.strip():
+            continue
+        header = [h.strip().lower() for h in _parse_csv_row(text)]
+        break
+    if header is None:
+        return
+    missing = [c for c in CSV_REQUIRED if c not in header]
+    if missing:
+        raise ImportFormatError(f"CSV header is missing column(s): {', '.join(missing)}")
+
+    wanted = [(i, name) for i, name in enumerate(header) if name in CSV_COLUMNS]
+    idx = 0
+    async for text in records:
+        if not text.strip():
+            continue
+        try:
+            cells = _parse_csv_row(text)
+        except csv.Error as e:
+            yield idx, None, f"Malformed CSV row: {e}"
+        else:
+            yield idx, {name: cells[i].strip() for i, name in wanted if i < len(cells) and cells[i].strip()}, None
+        idx += 1
+
+# ---------- NDJSON ----------
+
+async def iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    idx = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield idx, None, f"Invalid JSON: {e.msg}"
+        else:
+            if isinstance(obj, dict):
+                yield idx, obj, None
+            else:
+                yield idx, None, "Each line must be a JSON object"
+        idx += 1
+
+def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Record]:
+    lines = iter_lines(chunks)
+    return iter_csv(lines) if fmt == "csv" else iter_ndjson(lines)
@@ -0,0 +1,339 @@
+"""
+API latency / throughput suite on a synthetic dataset, with a stored baseline.
+
+    python -m benchmarks.api_suite [--users 1000] [--years 3] [--requests 300] [--concurrency 1,16]
+                                   [--repeat 3] [--ocr] [--save-baseline] [--baseline PATH] [--threshold 0.25]
+
+Builds (once, then reused from the temp dir) a benchmarks.synth_data database,
+copies it to a scratch file and drives the ASGI app in-process with httpx:
+each scenario runs --requests requests at every --concurrency level, as that
+many concurrent clients, --repeat times, and reports p50/p95/p99 latency and
+req/s of the best run.
+
+Scenarios: list_shallow (first page, random filters), list_deep_offset
+(?page= near the end), list_deep_cursor (cursor near the end),
+summary_category, summary_monthly, bulk (100 rows per POST), login and,
+with --ocr, extract_receipt on the files in receipts/ (needs the Donut
+dependencies). Requests are spread over --tokens logged-in users with random
+parameters.
+
+The conditional-GET response cache and the receipt cache are off unless
+RESPONSE_CACHE_ITEMS / RECEIPT_CACHE_MEM_ITEMS are set, so reads measure the
+queries rather than cache hits.
+
+--save-baseline writes the results to --baseline (default
+benchmarks/data/api_baseline.json). Otherwise, when that file exists, every
+result is compared with it: p95 more than --threshold slower (and by at least
+MIN_DELTA_MS), or throughput more than --threshold lower, is a regression and
+the exit status is 1. Baselines are only comparable on the same machine and
+settings; re-save after an intended change.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WORKDIR = tempfile.mkdtemp(prefix="pfa-suite-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/pfa.sqlite3"  # never the configured database
+os.environ["RECEIPT_CACHE_DIR"] = f"{WORKDIR}/receipt-cache"
+os.environ.setdefault("RESPONSE_CACHE_ITEMS", "0")
+os.environ.setdefault("RECEIPT_CACHE_MEM_ITEMS", "0")
+os.environ.setdefault("RECEIPT_CACHE_DISK_MB", "0")
+
+import logging  # noqa: E402
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from benchmarks import synth_data  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RECEIPTS_DIR = BACKEND_DIR / "receipts"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "data" / "api_baseline.json"
+MIN_DELTA_MS = 2.0  # smaller p95 differences are noise
+RECEIPT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".pdf": "application/pdf"}
+
+# (method, url, httpx request kwargs)
+Call = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass
+class BenchUser:
+    """A logged-in synthetic user and what the deep-page scenarios need."""
+    email: str
+    token: str
+    total: int
+    deep_cursor: Optional[str]
+
+
+@dataclass
+class Context:
+    logged_in: List[BenchUser]
+    users: int
+    years: Tuple[int, int]
+    category_ids: List[int]
+    receipts: List[Tuple[str, bytes, str]]
+
+# ---------- scenarios ----------
+
+LIMIT = 20
+
+def _auth(s: BenchUser) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {s.token}"}
+
+def _list_shallow(rnd: random.Random, ctx: Context) -> Call:
+    s = rnd.choice(ctx.logged_in)
+    url = f"/transactions?limit={LIMIT}"
+    if rnd.random() < 0.5:
+        url += "&type=expense"
+    if rnd.random() < 0.3:
+        url += f"&category_id={rnd.choice(ctx.category_ids)}"
+    return "GET", url, {"headers": _auth(s)}
+
+def _list_deep_offset(rnd: random.Random, ctx: Context) -> Call:
+    s = rnd.choice(ctx.logged_in)
+    page = max(1, int(s.total * 0.9) // LIMIT)
+    return "GET", f"/transactions?limit={LIMIT}&page={page}&with_total=false", {"headers": _auth(s)}
+
+def _list_deep_cursor(rnd: random.Random, ctx: Context) -> Call:
+    s = rnd.choice([s for s in ctx.logged_in if s.deep_cursor] or ctx.logged_in)
+    url = f"/transactions?limit={LIMIT}&with_total=false"
+    if s.deep_cursor:
+        url += f"&cursor={s.deep_cursor}"
+    return "GET", url, {"headers": _auth(s)}
+
+def _summary_category(rnd: random.Random, ctx: Context) -> Call:
+    year = rnd.randint(*ctx.years)
+    if rnd.random() < 0.5:
+        start, end = f"{year}-01-01", f"{year}-12-31"
+    else:
+        q = rnd.randint(0, 3)
+        start, end = f"{year}-{3 * q + 1:02d}-01", f"{year}-{3 * q + 3:02d}-28"
+    return "GET", f"/summary/category?from={start}&to={end}", {"headers": _auth(rnd.choice(ctx.logged_in))}
+
+def _summary_monthly(rnd: random.Random, ctx: Context) -> Call:
+    year = rnd.randint(*ctx.years)
+    return "GET", f"/summary/monthly?year={year}", {"headers": _auth(rnd.choice(ctx.logged_in))}
+
+def _bulk(rnd: random.Random, ctx: Context) -> Call:
+    year = ctx.years[1]
+    items = [{
+        "type": "expense",
+        "date": f"{year}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "category_id": rnd.choice(ctx.category_ids),
+        "amount_minor": rnd.randint(100, 500000),
+        "description": "bench",
+    } for _ in range(100)]
+    return "POST", "/transactions/bulk?summary=true", {"headers": _auth(rnd.choice(ctx.logged_in)), "json": items}
+
+def _login(rnd: random.Random, ctx: Context) -> Call:
+    email = f"user{rnd.randrange(ctx.users)}@bench.example"
+    return "POST", "/auth/login", {"data": {"username": email, "password": synth_data.PASSWORD}}
+
+def _extract_receipt(rnd: random.Random, ctx: Context) -> Call:
+    name, raw, content_type = rnd.choice(ctx.receipts)
+    return "POST", "/extract/receipt", {"files": {"file": (name, raw, content_type)}}
+
+# name -> (request factory, share of --requests)
+SCENARIOS: Dict[str, Tuple[Callable[[random.Random, Context], Call], float]] = {
+    "list_shallow": (_list_shallow, 1.0),
+    "list_deep_offset": (_list_deep_offset, 1.0),
+    "list_deep_cursor": (_list_deep_cursor, 1.0),
+    "summary_category": (_summary_category, 1.0),
+    "summary_monthly": (_summary_monthly, 1.0),
+    "bulk": (_bulk, 0.5),
+    "login": (_login, 0.1),             # bcrypt at BCRYPT_ROUNDS
+    "extract_receipt": (_extract_receipt, 0.05),
+}
+
+# ---------- setup ----------
+
+def _dataset(args) -> Path:
+    path = args.dataset or Path(tempfile.gettempdir()) / f"pfa-synth-u{args.users}-y{args.years}-s{args.seed}.sqlite3"
+    if not path.exists():
+        print(f"generating {args.users} users x {args.years} years -> {path}")
+        synth_data.build(path, args.users, args.years, args.seed)
+    shutil.copy(path, f"{WORKDIR}/pfa.sqlite3")
+    return path
+
+async def _log_in(client: httpx.AsyncClient, args) -> List[BenchUser]:
+    rnd = random.Random(args.seed)
+    out: List[BenchUser] = []
+    for i in rnd.sample(range(args.users), min(args.tokens, args.users)):
+        email = f"user{i}@bench.example"
+        r = await client.post("/auth/login", data={"username": email, "password": synth_data.PASSWORD})
+        r.raise_for_status()
+        token = r.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        page = (await client.get(f"/transactions?limit={LIMIT}", headers=headers)).json()
+        total, cursor, seen = page["total"], page["next_cursor"], LIMIT
+        # walk 100-row pages to ~90% depth; the next cursor is where the deep reads start
+        while cursor and seen + 100 < total * 0.9:
+            page = (await client.get(f"/transactions?limit=100&with_total=false&cursor={cursor}", headers=headers)).json()
+            cursor, seen = page["next_cursor"], seen + 100
+        out.append(BenchUser(email, token, total, cursor))
+    return out
+
+def _receipts(enabled: bool) -> List[Tuple[str, bytes, str]]:
+    if not enabled:
+        return []
+    return [
+        (p.name, p.read_bytes(), RECEIPT_TYPES[p.suffix.lower()])
+        for p in sorted(RECEIPTS_DIR.iterdir()) if p.suffix.lower() in RECEIPT_TYPES
+    ]
+
+# ---------- running ----------
+
+def _percentile(xs: List[float], q: float) -> float:
+    return xs[min(len(xs) - 1, int(q * len(xs)))] * 1000 if xs else float("nan")
+
+async def _run(client: httpx.AsyncClient, factory, ctx: Context, total: int, concurrency: int, seed: int) -> Dict[str, float]:
+    rnd = random.Random(seed)
+    calls = [factory(rnd, ctx) for _ in range(total)]
+    latencies: List[float] = []
+    errors = 0
+    it = iter(calls)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, url, kw in it:
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, url, **kw)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    xs = sorted(latencies)
+    return {
+        "requests": total,
+        "rps": round(len(xs) / elapsed, 2),
+        "p50_ms": round(_percentile(xs, 0.50), 2),
+        "p95_ms": round(_percentile(xs, 0.95), 2),
+        "p99_ms": round(_percentile(xs, 0.99), 2),
+        "errors": errors,
+    }
+
+async def _suite(args) -> Dict[str, Dict[str, float]]:
+    dataset = _dataset(args)
+    results: Dict[str, Dict[str, float]] = {}
+    async with app.router.lifespan_context(app):
+        # an unhandled error is a 500 for that request (counted), not an exception out of the client
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            ctx = Context(
+                logged_in=await _log_in(client, args),
+                users=args.users,
+                years=(synth_data.DEFAULT_END.year - args.years + 1, synth_data.DEFAULT_END.year),
+                category_ids=[],
+                receipts=_receipts(args.ocr),
+            )
+            categories = (await client.get("/categories", headers=_auth(ctx.logged_in[0]))).json()
+            ctx.category_ids = [c["id"] for c in categories if c["user_id"] is None]
+            print(f"dataset {dataset.name}: {args.users} users, {len(ctx.logged_in)} logged in")
+
+            for name, (factory, share) in SCENARIOS.items():
+                if name not in args.scenarios:
+                    continue
+                if name == "extract_receipt" and not ctx.receipts:
+                    continue
+                total = max(4, int(args.requests * share))
+                await _run(client, factory, ctx, min(total, 50), 1, args.seed + 1)  # warm-up: pages, plans, pools
+                for c in args.concurrency:
+                    key = f"{name}@c{c}"
+                    runs = [await _run(client, factory, ctx, total, c, args.seed) for _ in range(args.repeat)]
+                    results[key] = _best(runs)
+                    _print_row(key, results[key])
+    return results
+
+# ---------- reporting / baseline ----------
+
+def _best(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    # best of --repeat: the least disturbed run on a shared machine
+    return min(runs, key=lambda r: (r["errors"], r["p95_ms"]))
+
+def _print_row(key: str, r: Dict[str, float], note: str = "") -> None:
+    print(f"{key:<26}{r['rps']:>9,.1f} req/s  p50 {r['p50_ms']:8.1f}  p95 {r['p95_ms']:8.1f}"
+          f"  p99 {r['p99_ms']:8.1f} ms  errors {r['errors']}{note}")
+
+def _config(args) -> Dict[str, Any]:
+    return {
+        "users": args.users, "years": args.years, "seed": args.seed, "requests": args.requests,
+        "tokens": args.tokens, "repeat": args.repeat, "concurrency": args.concurrency,
+        "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+    }
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Regression messages (empty when everything is within `threshold` of the baseline)."""
+    problems = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + threshold) and r["p95_ms"] - base["p95_ms"] >= MIN_DELTA_MS:
+            problems.append(f"{key}: p95 {base['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+        if r["rps"] < base["rps"] * (1 - threshold):
+            problems.append(f"{key}: throughput {base['rps']:.1f} -> {r['rps']:.1f} req/s")
+        if r["errors"] and not base.get("errors"):
+            problems.append(f"{key}: {r['errors']} errors (baseline had none)")
+    return problems
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--years", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--dataset", type=Path, default=None, help="synth_data file to use/create (default: temp dir)")
+    ap.add_argument("--requests", type=int, default=300, help="per scenario and concurrency level (scaled per scenario)")
+    ap.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 16])
+    ap.add_argument("--tokens", type=int, default=50, help="logged-in users the requests are spread over")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per scenario and level; the best one is reported")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), type=lambda s: s.split(","))
+    ap.add_argument("--ocr", action="store_true", help="include extract_receipt (loads Donut)")
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed fractional regression")
+    args = ap.parse_args()
+
+    # concurrent writers wait on SQLite's lock inside execute(); that wait is what the numbers show
+    logging.getLogger("app.db").setLevel(logging.ERROR)
+    results = asyncio.run(_suite(args))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({"config": _config(args), "results": results}, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        return
+
+    stored = json.loads(args.baseline.read_text())
+    ignored = {"requests", "tokens", "repeat"}
+    if {k: v for k, v in stored["config"].items() if k not in ignored} != \
+            {k: v for k, v in _config(args).items() if k not in ignored}:
+        print(f"note: {args.baseline.name} was recorded with different settings: {stored['config']}")
+    problems = compare(results, stored["results"], args.threshold)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    print(f"{len(problems)} regression(s) vs {args.baseline.name} (threshold {args.threshold:.0%})")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
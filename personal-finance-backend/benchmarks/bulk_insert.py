@@ -0,0 +1,93 @@
+"""
+/transactions/bulk write path: ORM add_all + per-row refresh vs. chunked Core
+INSERT ... RETURNING.
+
+    python -m benchmarks.bulk_insert [--rows 10000] [--repeat 3]
+
+Runs against a throw-away migrated SQLite database. Both paths update the
+monthly rollup and commit once, like the endpoint does; rows/sec is printed
+for each.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+WORKDIR = tempfile.mkdtemp(prefix="pfa-bulk-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/pfa.sqlite3"  # never the configured database
+
+from sqlmodel import Session  # noqa: E402
+
+from app import rollup  # noqa: E402
+from app.db import create_db_and_tables, engine  # noqa: E402
+from app.models import Transaction, TxnType, User  # noqa: E402
+from app.routers.transactions import _insert_rows  # noqa: E402
+
+
+def _rows(n: int, user_id: int) -> List[Dict[str, Any]]:
+    rnd = random.Random(42)
+    now = datetime.utcnow()
+    start = date(2023, 1, 1)
+    out = []
+    for _ in range(n):
+        income = rnd.random() < 0.1
+        out.append({
+            "user_id": user_id,
+            "type": TxnType.income if income else TxnType.expense,
+            "date": start + timedelta(days=rnd.randrange(730)),
+            "category_id": None if income else rnd.randint(1, 5),
+            "description": None,
+            "amount_minor": rnd.randint(100, 500000),
+            "created_at": now,
+            "updated_at": now,
+        })
+    return out
+
+def orm_path(session: Session, rows: List[Dict[str, Any]]) -> None:
+    """What the endpoint did before: add_all, commit, refresh every row."""
+    prepared = [Transaction(**r) for r in rows]
+    session.add_all(prepared)
+    rollup.record_insert(session, prepared)
+    session.commit()
+    for tx in prepared:
+        session.refresh(tx)
+
+def core_path(session: Session, rows: List[Dict[str, Any]]) -> None:
+    _insert_rows(session, rows)
+    rollup.record_insert_rows(session, rows)
+    session.commit()
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        user = User(email="bench@example.com", name="Bench", password_hash="x")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+    rows = _rows(args.rows, user_id)
+    for name, fn in (("orm add_all+refresh", orm_path), ("core insert..returning", core_path)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            with Session(engine) as session:
+                t0 = time.perf_counter()
+                fn(session, rows)
+                best = min(best, time.perf_counter() - t0)
+        print(f"{name:<24}{args.rows / best:>12,.0f} rows/s  ({best * 1000:.1f} ms best of {args.repeat})")
+
+    with Session(engine) as session:
+        diffs = rollup.verify(session)
+    print("rollup matches raw data" if not diffs else f"{len(diffs)} mismatched rollup rows")
+
+
+if __name__ == "__main__":
+    main()
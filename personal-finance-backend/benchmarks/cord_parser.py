@@ -0,0 +1,164 @@
+"""
+Single-pass CORD parser vs. the previous per-block regex parser.
+
+    python -m benchmarks.cord_parser [--repeat 200]
+
+Runs both parsers over benchmarks/data/cord_corpus.jsonl (representative
+Donut CORD-v2 outputs, including malformed/unclosed markup), fails if any
+output differs, and prints the time per corpus pass for each.
+"""
+from __future__ import annotations
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.receipt_parser import parse_cord_items
+
+CORPUS = Path(__file__).resolve().parent / "data" / "cord_corpus.jsonl"
+
+
+# ---------- previous implementation (reference) ----------
+
+TAG_RE = re.compile(r"</?[^>]+>")  # to strip tags when needed
+
+def _dec_to_float(s: str) -> Optional[float]:
+    """Handle both 235.10 and 235,10; tolerate group separators."""
+    s = s.strip()
+    if not s:
+        return None
+    # decimal comma -> dot (but first remove group separators like '.' or spaces)
+    if re.search(r"\d+,\d{2}\b", s):
+        tmp = re.sub(r"(?<=\d)[.\s](?=\d{3}\b)", "", s)
+        tmp = tmp.replace(",", ".")
+        m = re.search(r"\d+(?:\.\d{1,2})?", tmp)
+        return float(m.group(0)) if m else None
+    # decimal point path (remove comma/space grouping)
+    tmp = re.sub(r"(?<=\d)[,\s](?=\d{3}\b)", "", s)
+    m = re.search(r"\d+(?:\.\d{1,2})?", tmp)
+    return float(m.group(0)) if m else None
+
+def _split_blocks(raw: str) -> List[str]:
+    """Split CORD-style output by <sep/> markers."""
+    return [b for b in raw.split("<sep/>") if b.strip()]
+
+def _find_all(tag: str, block: str) -> List[str]:
+    """Extract inner texts of repeated tags like <s_nm>...</s_nm> in a block."""
+    out = []
+    for m in re.finditer(fr"<{tag}>(.*?)</{tag}>", block, flags=re.S):
+        out.append(m.group(1).strip())
+    return out
+
+def _looks_like_total_or_meta(text: str) -> bool:
+    t = text.lower()
+    return any(kw in t for kw in [
+        "sum", "total", "varer", "bank", "mva", "vat", "tax", "kontant", "kort",
+        "authorized", "autoriser", "kasse", "kvitt", "resultat", "kopi", "psn",
+        "ref", "arc", "aid", "tid", "terminal", "terminal", "operator", "time",
+        "takk", "thanks", "receipt", "invoice"
+    ])
+
+DATE_PATTERNS = [
+    r"\b(\d{4})-(\d{2})-(\d{2})\b",      # 2023-10-02
+    r"\b(\d{2})[.\-\/](\d{2})[.\-\/](\d{2,4})\b",  # 02.10.23 or 02-10-2023
+]
+
+def _extract_date_from_raw(raw: str) -> Optional[str]:
+    # Prefer ISO yyyy-mm-dd first
+    m = re.search(DATE_PATTERNS[0], raw)
+    if m:
+        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
+    m = re.search(DATE_PATTERNS[1], raw)
+    if m:
+        d1, d2, d3 = m.groups()
+        if len(d3) == 2:  # yy -> 20yy
+            d3 = "20" + d3
+        try:
+            return f"{int(d3):04d}-{int(d2):02d}-{int(d1):02d}"
+        except Exception:
+            return None
+    return None
+
+def legacy_parse_cord_items(raw: str) -> Dict[str, Any]:
+    """
+    Returns:
+      { items: [{name, price}], total: float|None, date: 'YYYY-MM-DD'|None }
+    """
+    blocks = _split_blocks(raw)
+    items: List[Dict[str, Any]] = []
+    total: Optional[float] = None
+
+    for b in blocks:
+        names = _find_all("s_nm", b)
+        unitprices = _find_all("s_unitprice", b)
+        prices = _find_all("s_price", b)
+
+        # Prefer explicit <s_price>, else unitprice
+        nums = [x for x in (prices + unitprices) if x]
+        last_num = nums[-1] if nums else None
+        price_val = _dec_to_float(last_num) if last_num else None
+
+        # Pick a plausible name: last <s_nm> that isn't meta-ish
+        name = None
+        for cand in reversed(names):
+            # skip obvious numeric-only or meta-ish lines
+            if _looks_like_total_or_meta(cand):
+                continue
+            if re.fullmatch(r"[0-9\s\-\.:]+", cand):
+                continue
+            # clean nested tags if any
+            name = TAG_RE.sub("", cand).strip()
+            if name:
+                break
+
+        # Identify totals explicitly
+        if any(_looks_like_total_or_meta(n) and "total" in n.lower() for n in names) and price_val:
+            # capture overall total (doesn't go into items)
+            if (total is None) or (price_val > total):
+                total = price_val
+            continue
+
+        # Add item when we have both
+        if name and price_val is not None:
+            items.append({"name": name, "price": price_val})
+
+    date = _extract_date_from_raw(raw)
+    return {"items": items, "total": total, "date": date}
+
+
+# ---------- benchmark ----------
+
+def load_corpus() -> List[Dict[str, str]]:
+    with CORPUS.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=200, help="corpus passes per timing")
+    args = ap.parse_args()
+
+    corpus = load_corpus()
+    mismatches = [
+        doc["id"] for doc in corpus
+        if parse_cord_items(doc["raw"]) != legacy_parse_cord_items(doc["raw"])
+    ]
+    if mismatches:
+        print(f"output differs on: {', '.join(mismatches)}")
+        sys.exit(1)
+    print(f"identical output on {len(corpus)} corpus entries")
+
+    raws = [doc["raw"] for doc in corpus]
+    timings = {}
+    for label, fn in (("legacy", legacy_parse_cord_items), ("single-pass", parse_cord_items)):
+        best = min(timeit.repeat(lambda: [fn(r) for r in raws], number=args.repeat, repeat=5))
+        timings[label] = best / args.repeat * 1e6
+        print(f"{label:<12} {timings[label]:9.1f} us / corpus pass")
+    print(f"speed-up     {timings['legacy'] / timings['single-pass']:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
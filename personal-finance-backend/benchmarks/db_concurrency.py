@@ -0,0 +1,151 @@
+"""
+Reader/writer throughput on SQLite: old engine settings vs. app.db.make_engine.
+
+    python -m benchmarks.db_concurrency [--readers 8] [--writers 2] [--seconds 5] [--rows 20000]
+
+Each configuration gets its own fresh, migrated database seeded with the same
+rows. Reader threads run the GET /transactions page + COUNT queries, writer
+threads insert one transaction (with its rollup update) per commit, all at
+once for --seconds. Prints ops/s, p95 latency and "database is locked"
+errors per side.
+
+"before" = rollback journal, synchronous=FULL, no mmap, default page cache
+(what the engine used to get); "after" = SQLITE_PRAGMAS from app.db.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+WORKDIR = tempfile.mkdtemp(prefix="pfa-dbconc-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/unused.sqlite3"  # never the configured database
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app import rollup  # noqa: E402
+from app import db as app_db  # noqa: E402
+from app.models import Transaction, TxnType, User  # noqa: E402
+from app.routers.transactions import _insert_rows  # noqa: E402
+
+CONFIGS = {
+    "before": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "after": None,  # app.db.SQLITE_PRAGMAS
+}
+
+
+def _seed(engine, rows: int) -> int:
+    with Session(engine) as session:
+        user = User(email="bench@example.com", name="Bench", password_hash="x")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+        rnd = random.Random(7)
+        now = datetime.utcnow()
+        batch = [{
+            "user_id": user_id,
+            "type": TxnType.expense,
+            "date": date(2023, 1, 1) + timedelta(days=rnd.randrange(730)),
+            "category_id": rnd.randint(1, 5),
+            "description": None,
+            "amount_minor": rnd.randint(100, 50000),
+            "created_at": now,
+            "updated_at": now,
+        } for _ in range(rows)]
+        _insert_rows(session, batch)
+        rollup.record_insert_rows(session, batch)
+        session.commit()
+    return user_id
+
+def _read(engine, user_id: int) -> None:
+    with Session(engine) as session:
+        where = [Transaction.user_id == user_id]
+        session.exec(select(func.count()).select_from(Transaction).where(*where)).one()
+        session.exec(
+            select(Transaction.id, Transaction.date, Transaction.amount_minor)
+            .where(*where)
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+            .limit(20)
+        ).all()
+
+def _write(engine, user_id: int, rnd: random.Random) -> None:
+    with Session(engine) as session:
+        tx = Transaction(
+            user_id=user_id, type=TxnType.expense, date=date(2024, 1, 1) + timedelta(days=rnd.randrange(365)),
+            category_id=rnd.randint(1, 5), amount_minor=rnd.randint(100, 50000),
+        )
+        session.add(tx)
+        rollup.record_insert(session, [tx])
+        session.commit()
+
+def _run(name: str, args) -> Dict[str, Dict[str, float]]:
+    url = f"sqlite:///{WORKDIR}/{name}.sqlite3"
+    engine = app_db.make_engine(url, sqlite_pragmas=CONFIGS[name],
+                                pool_size=args.readers + args.writers, max_overflow=0)
+    app_db.engine = engine  # run_migrations uses the module-level engine
+    app_db.run_migrations()
+    user_id = _seed(engine, args.rows)
+
+    lat: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def worker(kind: str, seed: int) -> None:
+        rnd = random.Random(seed)
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            try:
+                _read(engine, user_id) if kind == "read" else _write(engine, user_id, rnd)
+            except OperationalError:
+                with lock:
+                    errors[kind] += 1
+                continue
+            with lock:
+                lat[kind].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker, args=("read", i)) for i in range(args.readers)]
+    threads += [threading.Thread(target=worker, args=("write", 100 + i)) for i in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    out = {}
+    for kind in ("read", "write"):
+        xs = sorted(lat[kind])
+        out[kind] = {
+            "ops_s": len(xs) / args.seconds,
+            "p95_ms": (xs[int(0.95 * (len(xs) - 1))] * 1000) if xs else float("nan"),
+            "median_ms": (statistics.median(xs) * 1000) if xs else float("nan"),
+            "errors": errors[kind],
+        }
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--rows", type=int, default=20000)
+    args = ap.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s, {args.rows} seeded rows")
+    for name in CONFIGS:
+        res = _run(name, args)
+        for kind, r in res.items():
+            print(f"{name:<7}{kind:<6}{r['ops_s']:>10,.0f} ops/s  median {r['median_ms']:7.2f} ms"
+                  f"  p95 {r['p95_ms']:7.2f} ms  locked errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare Donut runtime variants on the sample receipts in receipts/.
+
+    python -m benchmarks.donut_variants                    # all variants
+    python -m benchmarks.donut_variants --variants fp32 int8 --runs 5
+
+Each variant runs in its own subprocess so peak RSS is measured cleanly.
+Reports load time, per-receipt latency (p50 / mean), peak RSS and how many
+receipts parse to the same {items, total, date} as the fp32 baseline.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RECEIPTS_DIR = BACKEND_DIR / "receipts"
+
+
+def _load_samples() -> Dict[str, Any]:
+    from app.image_prep import prepare_image
+
+    samples: Dict[str, Any] = {}
+    for path in sorted(RECEIPTS_DIR.iterdir()):
+        suffix = path.suffix.lower()
+        if suffix in (".jpg", ".jpeg", ".png"):
+            samples[path.name] = prepare_image(path.read_bytes())  # what the API hands the workers
+        elif suffix == ".pdf":
+            try:
+                from app.pdf_ingest import iter_pdf_pages
+                samples[path.name] = next(iter_pdf_pages(path.read_bytes(), max_pages=1))
+            except Exception as e:  # poppler missing
+                print(f"skip {path.name}: {e}", file=sys.stderr)
+    return samples
+
+
+def _run_one(variant: str, runs: int) -> Dict[str, Any]:
+    """Child process: load one variant and time it on every sample."""
+    os.environ["DONUT_RUNTIME"] = variant
+    from app.donut_runtime import get_donut, run_donut
+    from app.routers.receipt import parse_cord_items
+
+    samples = _load_samples()
+
+    t0 = time.perf_counter()
+    get_donut(variant)
+    load_s = time.perf_counter() - t0
+
+    latencies: List[float] = []
+    parsed: Dict[str, Any] = {}
+    for name, img in samples.items():
+        run_donut(img)  # warm-up (compile / ORT graph init happen here)
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            out = run_donut(img)
+            latencies.append(time.perf_counter() - t0)
+        parsed[name] = parse_cord_items(out)
+
+    return {
+        "variant": variant,
+        "load_s": round(load_s, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "parsed": parsed,
+    }
+
+
+def main() -> None:
+    from app.donut_runtime import RUNTIME_VARIANTS
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--variants", nargs="+", default=list(RUNTIME_VARIANTS), choices=RUNTIME_VARIANTS)
+    ap.add_argument("--runs", type=int, default=3, help="timed runs per receipt (after one warm-up)")
+    ap.add_argument("--one", help=argparse.SUPPRESS)  # child mode
+    args = ap.parse_args()
+
+    if args.one:
+        print(json.dumps(_run_one(args.one, args.runs)))
+        return
+
+    results: List[Dict[str, Any]] = []
+    for variant in dict.fromkeys(["fp32", *args.variants]):  # baseline first
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.donut_variants", "--one", variant, "--runs", str(args.runs)],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{variant}: failed\n{proc.stderr.strip()[-2000:]}", file=sys.stderr)
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    baseline = next((r for r in results if r["variant"] == "fp32"), None)
+    print(f"{'variant':<9}{'load s':>8}{'p50 ms':>10}{'mean ms':>10}{'peak RSS MB':>13}{'agree':>8}")
+    for r in results:
+        agree = "-"
+        if baseline is not None:
+            same = sum(r["parsed"][k] == v for k, v in baseline["parsed"].items() if k in r["parsed"])
+            agree = f"{same}/{len(baseline['parsed'])}"
+        print(f"{r['variant']:<9}{r['load_s']:>8}{r['p50_ms']:>10}{r['mean_ms']:>10}{r['peak_rss_mb']:>13}{agree:>8}")
+
+
+if __name__ == "__main__":
+    main()
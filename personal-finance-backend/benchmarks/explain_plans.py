@@ -0,0 +1,101 @@
+"""
+EXPLAIN QUERY PLAN for every SQL statement the read/write endpoints issue.
+
+    python -m benchmarks.explain_plans
+
+Builds a throw-away migrated SQLite database, drives the endpoints through
+the ASGI app, records the SQL they execute and prints SQLite's plan for each
+statement. Exits 1 if any statement scans `transactions` or `categories`
+without an index.
+"""
+from __future__ import annotations
+import os
+import sys
+import tempfile
+from typing import List, Tuple
+
+WORKDIR = tempfile.mkdtemp(prefix="pfa-explain-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/pfa.sqlite3"  # never the configured database
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+TABLES = ("transactions", "categories")
+
+captured: List[Tuple[str, str, tuple]] = []
+_current_endpoint = ""
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT") and any(t in statement for t in TABLES):
+        captured.append((_current_endpoint, statement, tuple(parameters or ())))
+
+
+def _drive(client: TestClient) -> None:
+    global _current_endpoint
+
+    def call(method: str, url: str, **kw):
+        global _current_endpoint
+        _current_endpoint = f"{method} {url}"
+        r = client.request(method, url, **kw)
+        assert r.status_code < 400, (url, r.status_code, r.text)
+        return r
+
+    call("POST", "/auth/register", json={"email": "plan@example.com", "full_name": "Plan", "password": "pw"})
+    token = call("POST", "/auth/login", data={"username": "plan@example.com", "password": "pw"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    rows = [
+        {"type": "expense", "date": f"2024-{m:02d}-{d:02d}", "category_id": 1 + (m + d) % 5, "amount_minor": 100 * d}
+        for m in range(1, 13) for d in (3, 14, 25)
+    ] + [{"type": "income", "date": f"2024-{m:02d}-01", "amount_minor": 500000} for m in range(1, 13)]
+    call("POST", "/transactions/bulk", json=rows)
+    call("POST", "/transactions", json={"type": "expense", "date": "2024-06-01", "category_id": 1, "amount": "10.00"})
+
+    page = call("GET", "/transactions?limit=10").json()
+    call("GET", f"/transactions?limit=10&with_total=false&cursor={page['next_cursor']}")
+    call("GET", "/transactions?page=3&limit=10&from=2024-03-01&to=2024-09-30")
+    call("GET", "/transactions?type=expense&category_id=2")
+    call("GET", "/transactions/export?format=ndjson&from=2024-03-01")
+    call("GET", "/transactions/export?category_id=2")
+    call("GET", "/summary/category?from=2024-01-01&to=2024-06-30")
+    call("GET", "/summary/monthly?year=2024")
+    call("GET", "/summary/timeseries?from=2024-02-10&to=2024-11-20&bucket=week")
+    call("GET", "/categories")
+    call("POST", "/categories", json={"user_id": 1, "name": "Plan category"})
+    _current_endpoint = ""
+
+
+def main() -> None:
+    with TestClient(app) as client:
+        _drive(client)
+
+    bad = 0
+    seen = set()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for endpoint, statement, params in captured:
+            if (endpoint, statement) in seen:
+                continue
+            seen.add((endpoint, statement))
+            plan = [row[-1] for row in cur.execute(f"EXPLAIN QUERY PLAN {statement}", params)]
+            full_scans = [p for p in plan if p.startswith("SCAN") and any(t in p for t in TABLES)]
+            bad += bool(full_scans)
+            print(f"{'FULL SCAN' if full_scans else 'ok':<10}{endpoint}")
+            print("          " + " ".join(statement.split())[:160])
+            for p in plan:
+                print(f"            {p}")
+    finally:
+        raw.close()
+
+    print(f"\n{len(seen)} statements, {bad} with full scans")
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Receipt image preprocessing: full decode vs. app/image_prep.py.
+
+    python -m benchmarks.image_prep [--runs 10] [--processor]
+
+For every image in receipts/ compares what a receipt costs before it reaches
+Donut's processor:
+
+- full: `Image.open(raw).convert("RGB")` at native resolution (the old router
+  code), fitted + padded to DONUT_IMAGE_SIZE with the processor's geometry;
+- prep: prepare_image (draft-mode decode, EXIF transpose, autocrop, fit).
+
+Prints the median time, the pickled size of the image sent to an inference
+worker (full: the native-size image; the fit happened in the worker) and the
+peak RSS growth of one run in a fresh interpreter (Linux). With --processor
+(needs transformers) it also times DonutImageProcessor on both: the full-size
+image through resize + pad, the prepared one with those steps switched off.
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import pickle
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from PIL import Image
+
+from app.image_prep import fit_image, prepare_image
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RECEIPTS_DIR = BACKEND_DIR / "receipts"
+
+# VmHWM rather than ru_maxrss: the latter carries over the parent's peak across fork + exec (Linux)
+RSS_CHILD = """
+import json, sys
+from pathlib import Path
+from benchmarks.image_prep import VARIANTS
+def peak_kb():
+    for line in open("/proc/self/status"):
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1])
+raw = Path(sys.argv[1]).read_bytes()
+before = peak_kb()
+img = VARIANTS[sys.argv[2]](raw)
+print(json.dumps({"rss_mb": (peak_kb() - before) / 1024}))
+"""
+
+
+def _full(raw: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(raw)).convert("RGB")
+
+VARIANTS: Dict[str, Callable[[bytes], Image.Image]] = {
+    "full": lambda raw: fit_image(_full(raw)),
+    "prep": prepare_image,
+}
+
+
+def _median_ms(fn: Callable[[], object], runs: int) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+def _peak_rss_mb(path: Path, variant: str) -> float:
+    proc = subprocess.run(
+        [sys.executable, "-c", RSS_CHILD, str(path), variant],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])["rss_mb"]
+
+def _processor_ms(raw: bytes, runs: int) -> Dict[str, float]:
+    from transformers import DonutImageProcessor
+    from app.config import DONUT_MODEL_ID
+
+    processor = DonutImageProcessor.from_pretrained(DONUT_MODEL_ID)
+    full, prepared = _full(raw), prepare_image(raw)
+    ready = {"do_resize": False, "do_thumbnail": False, "do_align_long_axis": False, "do_pad": False}
+    return {
+        "full": _median_ms(lambda: processor(full, return_tensors="pt"), runs),
+        "prep": _median_ms(lambda: processor(prepared, return_tensors="pt", **ready), runs),
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--processor", action="store_true", help="also time DonutImageProcessor (needs transformers)")
+    args = ap.parse_args()
+
+    paths = [p for p in sorted(RECEIPTS_DIR.iterdir()) if p.suffix.lower() in (".jpg", ".jpeg", ".png")]
+    print(f"{'image':<22}{'native':>11}  {'':<5}{'ms':>7}{'to worker MB':>14}{'peak RSS +MB':>14}"
+          + (f"{'processor ms':>14}" if args.processor else ""))
+    for path in paths:
+        raw = path.read_bytes()
+        native = Image.open(io.BytesIO(raw)).size
+        proc_ms = _processor_ms(raw, args.runs) if args.processor else {}
+        for variant, fn in VARIANTS.items():
+            row: List[str] = [
+                f"{path.name if variant == 'full' else '':<22}",
+                f"{'%dx%d' % native if variant == 'full' else '':>11}",
+                f"  {variant:<5}",
+                f"{_median_ms(lambda: fn(raw), args.runs):7.1f}",
+                f"{len(pickle.dumps(_full(raw) if variant == 'full' else fn(raw))) / 1e6:14.1f}",
+                f"{_peak_rss_mb(path, variant):14.1f}",
+            ]
+            if proc_ms:
+                row.append(f"{proc_ms[variant]:14.1f}")
+            print("".join(row))
+
+
+if __name__ == "__main__":
+    main()
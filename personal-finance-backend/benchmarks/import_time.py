@@ -0,0 +1,75 @@
+"""
+Cold import cost of the API: `import app.main` in fresh interpreters.
+
+    python -m benchmarks.import_time [--runs 7] [--modules app.routers.receipt,app.export]
+
+Prints the median wall time and peak RSS of the import, the cumulative
+`-X importtime` cost of each --modules entry, and which of the heavy OCR /
+export libraries got imported along the way (none of the OCR ones should be:
+they load on first use, or with OCR_WARMUP=1).
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+HEAVY = ("torch", "transformers", "pdf2image", "pdfplumber", "pdfminer", "PIL", "pyarrow")
+
+CHILD = f"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "s": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [m for m in {HEAVY!r} if m in sys.modules],
+}}))
+"""
+
+
+def _run_once(modules: List[str]) -> Dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp(prefix='pfa-import-')}/pfa.sqlite3",  # never the configured database
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    # "import time: self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() in modules:
+            cumulative[parts[2].strip()] = int(parts[1]) / 1000
+    out["modules_ms"] = cumulative
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--modules", default="app.routers.receipt,app.inference,app.export",
+                    type=lambda s: s.split(","))
+    args = ap.parse_args()
+
+    runs = [_run_once(args.modules) for _ in range(args.runs)]
+    print(f"import app.main: median {statistics.median(r['s'] for r in runs) * 1000:.0f} ms, "
+          f"peak RSS {statistics.median(r['rss_mb'] for r in runs):.0f} MB ({args.runs} runs)")
+    for m in args.modules:
+        xs = [r["modules_ms"][m] for r in runs if m in r["modules_ms"]]
+        if xs:
+            print(f"  {m:<24}{statistics.median(xs):8.1f} ms cumulative")
+    print(f"heavy modules loaded: {', '.join(runs[-1]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
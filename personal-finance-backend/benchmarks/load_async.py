@@ -0,0 +1,138 @@
+"""
+HTTP load test: sync routers (thread pool) vs. DB_ASYNC=1 routers (AsyncSession).
+
+    python -m benchmarks.load_async [--concurrency 200] [--requests 4000] [--rows 5000]
+
+For each mode, starts `uvicorn app.main:app` on a free port against its own
+temp SQLite database and seeds one user with --rows transactions. It then
+keeps --concurrency requests in flight, cycling through list, summary and
+category reads, until --requests have completed. Prints throughput and
+p50/p95/p99 latency per mode. Needs uvicorn, and aiosqlite for the async mode.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PATHS = [
+    "/transactions?limit=20",
+    "/transactions?limit=20&type=expense&category_id=2",
+    "/summary/monthly?year=2024",
+    "/summary/category?from=2024-01-01&to=2024-12-31",
+    "/categories",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _start_server(mode: str, port: int) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp(prefix=f"pfa-load-{mode}-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{workdir}/pfa.sqlite3",
+        "DB_ASYNC": "1" if mode == "async" else "0",
+        "BCRYPT_ROUNDS": "4",  # the benchmark user, not what we measure
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+async def _wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen) -> None:
+    for _ in range(300):
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+async def _seed(client: httpx.AsyncClient, rows: int) -> None:
+    await client.post("/auth/register", json={"email": "load@example.com", "full_name": "Load", "password": "pw"})
+    r = await client.post("/auth/login", data={"username": "load@example.com", "password": "pw"})
+    client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+    rnd = random.Random(1)
+    items = [{
+        "type": "expense",
+        "date": f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "category_id": rnd.randint(1, 5),
+        "amount_minor": rnd.randint(100, 50000),
+    } for _ in range(rows)]
+    r = await client.post("/transactions/bulk?summary=true", json=items)
+    r.raise_for_status()
+
+async def _load(client: httpx.AsyncClient, concurrency: int, total: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(PATHS[i % len(PATHS)])
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    xs = sorted(latencies)
+    pct = lambda q: xs[min(len(xs) - 1, int(q * len(xs)))] * 1000 if xs else float("nan")  # noqa: E731
+    return {"rps": len(xs) / elapsed, "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "errors": errors}
+
+async def _run_mode(mode: str, args) -> Dict[str, float]:
+    port = _free_port()
+    proc = _start_server(mode, port)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await _wait_ready(client, proc)
+            await _seed(client, args.rows)
+            await _load(client, min(args.concurrency, 20), min(args.requests, 200))  # warm-up
+            return await _load(client, args.concurrency, args.requests)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=4000)
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--modes", default="sync,async")
+    args = ap.parse_args()
+
+    print(f"{args.concurrency} concurrent, {args.requests} requests, {args.rows} seeded rows")
+    for mode in args.modes.split(","):
+        r = asyncio.run(_run_mode(mode, args))
+        print(f"{mode:<6}{r['rps']:>8,.0f} req/s  p50 {r['p50']:7.1f} ms  p95 {r['p95']:7.1f} ms"
+              f"  p99 {r['p99']:7.1f} ms  errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
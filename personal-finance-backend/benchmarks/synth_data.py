@@ -0,0 +1,207 @@
+"""
+Synthetic users with multi-year transaction histories, for benchmarks.
+
+    python -m benchmarks.synth_data --out /tmp/pfa-synth.sqlite3 [--users 1000] [--years 3] [--seed 1]
+
+Builds a fresh migrated SQLite file (never the configured database) with the
+seeded DEFAULT_CATEGORIES, a few per-user categories (rent, gym, pets, ...)
+and, per user, one salary a month plus expenses whose frequency, amount range
+and seasonality depend on the category. Rows go in with Core executemany
+INSERTs, and monthly_rollups is rebuilt from them at the end. The same --seed gives the same database.
+
+Every user is `user<N>@bench.example` with password PASSWORD, hashed once at
+the configured BCRYPT_ROUNDS so logins measure the real verify cost.
+"""
+from __future__ import annotations
+import argparse
+import logging
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app import db as app_db
+from app import rollup
+from app.core.security import get_password_hash
+from app.models import Category, MonthlyRollup, Transaction, TxnType, User
+from app.seed import seed_categories
+
+PASSWORD = "bench-password"
+DEFAULT_END = date(2025, 12, 31)
+USERS_PER_COMMIT = 50
+
+# category -> (mean transactions per month, amount range in rupees, merchants)
+EXPENSE_PROFILES: Dict[str, Tuple[float, Tuple[int, int], Tuple[str, ...]]] = {
+    "Food": (14, (40, 1800), ("Swiggy", "Zomato", "BigBasket", "Local kirana", "Cafe Coffee Day")),
+    "Transport": (8, (30, 900), ("Uber", "Ola", "Metro card", "Fuel")),
+    "Entertainment": (2.5, (150, 2500), ("BookMyShow", "Netflix", "Spotify", "Concert")),
+    "Utilites": (2, (300, 4500), ("Electricity", "Broadband", "Mobile recharge", "Water")),
+    "Eucation": (0.3, (500, 15000), ("Udemy", "Books", "Coursera", "Tuition")),
+    "Household": (2, (200, 6000), ("DMart", "Amazon", "IKEA", "Hardware store")),
+    "Electronics": (0.15, (1500, 80000), ("Croma", "Amazon", "Flipkart", "Reliance Digital")),
+    "Family": (1, (500, 10000), ("Gift", "School fees", "Pharmacy")),
+    "Personal Care": (1.5, (100, 3000), ("Salon", "Nykaa", "Pharmacy")),
+    "Other": (1, (50, 5000), (None,)),
+}
+# user categories: each user picks a few; fixed monthly ones repeat on the same day
+USER_PROFILES: Dict[str, Tuple[float, Tuple[int, int], Tuple[str, ...]]] = {
+    "Rent": (1, (8000, 45000), ("Rent",)),
+    "Gym": (1, (800, 3500), ("Gym membership",)),
+    "Pets": (1.5, (300, 4000), ("Vet", "Pet food")),
+    "Travel": (0.4, (3000, 60000), ("IndiGo", "IRCTC", "MakeMyTrip", "Hotel")),
+    "Subscriptions": (3, (99, 999), ("YouTube Premium", "iCloud", "Prime", "Hotstar")),
+    "Coffee": (10, (90, 450), ("Starbucks", "Blue Tokai", "Third Wave")),
+}
+FIXED_MONTHLY = {"Rent", "Gym"}
+# December and festival-season spending bump
+SEASONALITY = {10: 1.15, 11: 1.2, 12: 1.3}
+
+
+def _poisson(rnd: random.Random, mean: float) -> int:
+    # Knuth; means here are small
+    limit, k, p = math.exp(-mean), 0, 1.0
+    while True:
+        p *= rnd.random()
+        if p <= limit:
+            return k
+        k += 1
+
+def _amount_minor(rnd: random.Random, lo: int, hi: int) -> int:
+    # log-uniform: many small purchases, a few large ones
+    return int(math.exp(rnd.uniform(math.log(lo), math.log(hi))) * 100)
+
+def _months(start: date, end: date) -> List[date]:
+    out, d = [], start.replace(day=1)
+    while d <= end:
+        out.append(d)
+        d = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return out
+
+def _user_rows(
+    rnd: random.Random,
+    user_id: int,
+    categories: Dict[str, int],
+    start: date,
+    end: date,
+) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    salary = _amount_minor(rnd, 25000, 250000)
+    payday = rnd.choice((1, 5, 28))
+    spend = rnd.uniform(0.6, 1.6)  # how much this user spends relative to the profiles
+    fixed = {name: _amount_minor(rnd, *USER_PROFILES[name][1]) for name in sorted(FIXED_MONTHLY) if name in categories}
+    rows: List[Dict[str, Any]] = []
+
+    def add(kind: TxnType, day: date, category: str, amount_minor: int, description: Any) -> None:
+        rows.append({
+            "user_id": user_id, "type": kind, "date": day, "category_id": categories.get(category),
+            "description": description, "amount_minor": amount_minor, "created_at": now, "updated_at": now,
+        })
+
+    for month in _months(start, end):
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        days = (min(next_month - timedelta(days=1), end) - month).days + 1
+        if month.replace(day=min(payday, days)) <= end:
+            add(TxnType.income, month.replace(day=min(payday, days)), "Other", salary, "Salary")
+        if rnd.random() < 0.1:
+            add(TxnType.income, month + timedelta(days=rnd.randrange(days)), "Other",
+                _amount_minor(rnd, 2000, 60000), rnd.choice(("Freelance", "Refund", "Interest", None)))
+
+        season = SEASONALITY.get(month.month, 1.0)
+        for name, (per_month, (lo, hi), merchants) in {**EXPENSE_PROFILES, **USER_PROFILES}.items():
+            if name not in categories:
+                continue
+            if name in fixed:
+                add(TxnType.expense, month.replace(day=min(3, days)), name, fixed[name], merchants[0])
+                continue
+            for _ in range(_poisson(rnd, per_month * spend * season)):
+                description = rnd.choice(merchants) if rnd.random() < 0.7 else None
+                add(TxnType.expense, month + timedelta(days=rnd.randrange(days)), name,
+                    _amount_minor(rnd, lo, hi), description)
+    return rows
+
+def generate(engine, users: int, years: int, seed: int = 1, end: date = DEFAULT_END) -> Dict[str, int]:
+    """Adds `users` synthetic users to an already migrated + seeded database."""
+    rnd = random.Random(seed)
+    start = date(end.year - years + 1, 1, 1)
+    password_hash = get_password_hash(PASSWORD)
+    total_rows = 0
+
+    with Session(engine) as session:
+        globals_ = {c.name: c.id for c in session.exec(select(Category).where(Category.user_id.is_(None)))}
+        for first in range(0, users, USERS_PER_COMMIT):
+            batch = range(first, min(users, first + USERS_PER_COMMIT))
+            now = datetime.utcnow()
+            user_ids = session.exec(
+                insert(User.__table__).returning(User.__table__.c.id, sort_by_parameter_order=True),
+                params=[{"email": f"user{i}@bench.example", "name": f"Bench User {i}",
+                         "password_hash": password_hash, "created_at": now} for i in batch],
+            ).scalars().all()
+
+            own = {uid: rnd.sample(sorted(USER_PROFILES), rnd.randint(0, 3)) for uid in user_ids}
+            cat_params = [{"user_id": uid, "name": name, "created_at": now} for uid, names in own.items() for name in names]
+            cat_ids = session.exec(
+                insert(Category.__table__).returning(Category.__table__.c.id, sort_by_parameter_order=True),
+                params=cat_params,
+            ).scalars().all() if cat_params else []
+            user_cats: Dict[int, Dict[str, int]] = {uid: dict(globals_) for uid in user_ids}
+            for p, cid in zip(cat_params, cat_ids):
+                user_cats[p["user_id"]][p["name"]] = cid
+
+            rows: List[Dict[str, Any]] = []
+            for uid in user_ids:
+                rows.extend(_user_rows(rnd, uid, user_cats[uid], start, end))
+            session.exec(insert(Transaction.__table__), params=rows)  # ids not needed: plain executemany
+            session.commit()
+            total_rows += len(rows)
+
+        # fresh database: build monthly_rollups from the raw rows in one pass
+        session.exec(insert(MonthlyRollup.__table__), params=[
+            {"user_id": uid, "year_month": ym, "category_id": cid, "type": t, "sum_minor": s, "count": c}
+            for (uid, ym, cid, t), (s, c) in rollup.compute_from_raw(session).items()
+        ])
+        session.commit()
+
+    return {"users": users, "transactions": total_rows, "from_year": start.year, "to_year": end.year}
+
+def build(path: Path, users: int, years: int, seed: int = 1, end: date = DEFAULT_END) -> Dict[str, int]:
+    """Fresh migrated SQLite database at `path` filled by generate()."""
+    path = Path(path)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    engine = app_db.make_engine(f"sqlite:///{path}")
+    configured, app_db.engine = app_db.engine, engine  # run_migrations uses the module-level engine
+    try:
+        app_db.run_migrations()
+    finally:
+        app_db.engine = configured
+    with Session(engine) as session:
+        seed_categories(session)
+    try:
+        return generate(engine, users, years, seed, end)
+    finally:
+        engine.dispose()
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True, type=Path, help="SQLite file to (re)create")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--years", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END, help="last day of history (YYYY-MM-DD)")
+    args = ap.parse_args()
+
+    logging.getLogger("app.db").setLevel(logging.ERROR)  # bulk loads trip the slow-query log by design
+    t0 = time.perf_counter()
+    stats = build(args.out, args.users, args.years, args.seed, args.end)
+    elapsed = time.perf_counter() - t0
+    print(f"{stats['users']} users, {stats['transactions']:,} transactions "
+          f"({stats['from_year']}-{stats['to_year']}) in {elapsed:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
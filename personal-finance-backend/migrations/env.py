@@ -0,0 +1,52 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlmodel import SQLModel
+
+from app import models  # noqa: F401  (registers tables on SQLModel.metadata)
+from app.db import engine
+
+config = context.config
+target_metadata = SQLModel.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,  # SQLite can't ALTER most things in place
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # API startup (app.db.run_migrations) hands us its own connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    # CLI: `alembic upgrade head`
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    with engine.connect() as connection:
+        _run(connection)
+        connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,45 @@
+"""composite indexes for the user/date/type/category access paths
+
+Every query filters by user_id first:
+- GET /transactions: user_id [+ date range] ORDER BY date DESC, id DESC
+  -> (user_id, date, id); with ?category_id -> (user_id, category_id, date, id)
+- /summary/*: user_id, type = 'expense', date range, SUM(amount_minor) by category
+  -> (user_id, type, date, category_id, amount_minor), covering (no table lookups)
+- category lookups / uniqueness check by (user_id, name)
+
+Revision ID: 0002_access_path_indexes
+Revises: 0001_initial
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002_access_path_indexes"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transactions_user_date_id", "transactions",
+        ["user_id", "date", "id"], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_transactions_user_category_date_id", "transactions",
+        ["user_id", "category_id", "date", "id"], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_transactions_user_type_date", "transactions",
+        ["user_id", "type", "date", "category_id", "amount_minor"], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_categories_user_name", "categories",
+        ["user_id", "name"], if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_categories_user_name", table_name="categories")
+    op.drop_index("ix_transactions_user_type_date", table_name="transactions")
+    op.drop_index("ix_transactions_user_category_date_id", table_name="transactions")
+    op.drop_index("ix_transactions_user_date_id", table_name="transactions")
@@ -0,0 +1,56 @@
+"""monthly_rollups: (user_id, year_month, category_id, type) -> sum_minor, count
+
+Backfilled from transactions; kept in step by the transaction write paths.
+
+Revision ID: 0003_monthly_rollups
+Revises: 0002_access_path_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_monthly_rollups"
+down_revision = "0002_access_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "monthly_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("year_month", sa.String(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        # plain VARCHAR: don't re-create the txntype enum on PostgreSQL
+        sa.Column("type", sa.Enum("expense", "income", name="txntype", native_enum=False), nullable=False),
+        sa.Column("sum_minor", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["category_id"], ["categories.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_monthly_rollups_user_type_month", "monthly_rollups",
+        ["user_id", "type", "year_month", "category_id"], if_not_exists=True,
+    )
+
+    if op.get_bind().dialect.name == "sqlite":
+        year_month = "strftime('%Y-%m', date)"
+    else:
+        year_month = "to_char(date, 'YYYY-MM')"
+    op.execute("DELETE FROM monthly_rollups")  # re-runnable after a partial attempt
+    op.execute(
+        f"""
+        INSERT INTO monthly_rollups (user_id, year_month, category_id, type, sum_minor, count)
+        SELECT user_id, {year_month}, category_id, type, SUM(amount_minor), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, {year_month}, category_id, type
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_monthly_rollups_user_type_month", table_name="monthly_rollups")
+    op.drop_table("monthly_rollups")
@@ -0,0 +1,30 @@
+"""user_data_versions: per-user counter behind ETag / If-None-Match on the read endpoints
+
+No backfill: a user without a row is at version 0.
+
+Revision ID: 0004_user_data_versions
+Revises: 0003_monthly_rollups
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_user_data_versions"
+down_revision = "0003_monthly_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_data_versions",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_data_versions")
@@ -0,0 +1,48 @@
+"""monthly_rollups: one row per bucket, no negative counts
+
+Rebuilt from transactions first, which also collapses any duplicate buckets
+written by the old update-then-insert path. NULL category_id (income) is
+coalesced to -1 so those buckets are unique too.
+
+Revision ID: 0005_rollup_bucket_unique
+Revises: 0004_user_data_versions
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_rollup_bucket_unique"
+down_revision = "0004_user_data_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        year_month = "strftime('%Y-%m', date)"
+    else:
+        year_month = "to_char(date, 'YYYY-MM')"
+    op.execute("DELETE FROM monthly_rollups")
+    op.execute(
+        f"""
+        INSERT INTO monthly_rollups (user_id, year_month, category_id, type, sum_minor, count)
+        SELECT user_id, {year_month}, category_id, type, SUM(amount_minor), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, {year_month}, category_id, type
+        """
+    )
+
+    # SQLite can't ALTER TABLE ... ADD CONSTRAINT: batch mode recreates the table
+    with op.batch_alter_table("monthly_rollups") as batch:
+        batch.create_check_constraint("ck_monthly_rollups_count_nonneg", "count >= 0")
+    op.create_index(
+        "ux_monthly_rollups_bucket", "monthly_rollups",
+        ["user_id", "type", "year_month", sa.text("coalesce(category_id, -1)")],
+        unique=True, if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_monthly_rollups_bucket", table_name="monthly_rollups")
+    with op.batch_alter_table("monthly_rollups") as batch:
+        batch.drop_constraint("ck_monthly_rollups_count_nonneg", type_="check")
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# a throwaway database and receipt cache; set before anything imports app.config
+_TMP = tempfile.mkdtemp(prefix="pfa-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/pfa.sqlite3"
+os.environ["RECEIPT_CACHE_DIR"] = f"{_TMP}/cache"
+os.environ["DB_ASYNC"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        c.post("/auth/register", json={"email": "import@test.local", "full_name": "T", "password": "pw"})
+        r = c.post("/auth/login", data={"username": "import@test.local", "password": "pw"})
+        c.headers["Authorization"] = "Bearer " + r.json()["access_token"]
+        yield c
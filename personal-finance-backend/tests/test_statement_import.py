@@ -0,0 +1,105 @@
+"""
+POST /transactions/import with the body split over many ASGI messages.
+
+The app is called directly so the server's receive() hands out one small
+http.request message at a time (more_body=True), as uvicorn does for a large
+upload, and reports ASGI spec 2.3 so StreamingResponse also listens for
+disconnects on that same receive().
+"""
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+from app.main import app
+
+ROWS = 2000
+
+
+def _post_chunked(path: str, headers: Dict[str, str], body: bytes, chunk: int = 64) -> Tuple[int, List[dict]]:
+    messages = [
+        {"type": "http.request", "body": body[i:i + chunk], "more_body": True}
+        for i in range(0, len(body), chunk)
+    ] + [{"type": "http.request", "body": b"", "more_body": False}]
+    sent: List[dict] = []
+
+    async def run() -> None:
+        done = asyncio.Event()
+
+        async def receive() -> dict:
+            await asyncio.sleep(0)  # let other tasks (the response) interleave
+            if messages:
+                return messages.pop(0)
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                done.set()
+
+        path_only, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path_only,
+            "raw_path": path_only.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+        }
+        # a body chunk lost to the disconnect listener leaves the endpoint waiting forever
+        await asyncio.wait_for(app(scope, receive, send), timeout=30)
+
+    asyncio.run(run())
+    status = sent[0]["status"]
+    text = b"".join(m.get("body", b"") for m in sent[1:]).decode()
+    return status, [json.loads(line) for line in text.splitlines()]
+
+
+def _csv(rows: int, bad_at: int = -1) -> bytes:
+    lines = ["type,date,category_id,description,amount,amount_minor"]
+    for i in range(rows):
+        amount = "-1" if i == bad_at else str(100 + i)
+        lines.append(f"income,2024-05-{i % 28 + 1:02d},,row {i},,{amount}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _ids(client) -> List[int]:
+    ids: List[int] = []
+    cursor = None
+    while True:
+        params = {"limit": 100, "from": "2024-05-01", "to": "2024-05-31"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/transactions", params=params).json()
+        ids += [it["id"] for it in page["items"]]
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return ids
+
+
+def test_chunked_body_is_imported_completely(client):
+    before = len(_ids(client))
+    headers = {"Content-Type": "text/csv", "Authorization": client.headers["Authorization"]}
+    status, lines = _post_chunked("/transactions/import", headers, _csv(ROWS))
+
+    assert status == 200
+    assert lines[-1] == {"done": True, "inserted": ROWS, "failed": 0, "committed": True, "error": None}
+    assert sum(line.get("inserted", 0) for line in lines[:-1]) == ROWS
+    assert len(_ids(client)) == before + ROWS
+
+
+def test_chunked_atomic_import_rolls_back(client):
+    before = len(_ids(client))
+    headers = {"Content-Type": "text/csv", "Authorization": client.headers["Authorization"]}
+    status, lines = _post_chunked("/transactions/import?atomic=true", headers, _csv(ROWS, bad_at=ROWS - 1))
+
+    assert status == 200
+    assert lines[-1]["committed"] is False and lines[-1]["failed"] == 1 and lines[-1]["error"] is None
+    assert [line["index"] for line in lines if "index" in line] == [ROWS - 1]
+    assert len(_ids(client)) == before